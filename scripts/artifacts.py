@@ -0,0 +1,171 @@
+import os
+import io
+import sys
+import gzip
+import stat
+import shutil
+import importlib.util
+from itertools import zip_longest
+import verif_utils
+
+# settings under sim: artifacts: in config.yml
+default_settings = {
+    "compress": "gzip",  # codec of dumps and logs of passing cases: gzip, zstd or none
+    "level": None,  # compression level, None for the default of the codec
+    "window": 10,  # dump lines kept before and after each mismatch of a failing case
+    "max_windows": 20,  # mismatches with a window, 0 keeps the whole dump
+    "budget": 8192,  # MB of all result directories of a module, 0 for no limit
+}
+codec_ext = {"gzip": ".gz", "zstd": ".zst"}
+log_ext = [".log", ".jou"]
+windows_suffix = ".win"  # dut_out.txt -> dut_out.win.txt
+block_size = 1 << 20  # bytes per read while compressing
+
+# zstd needs the optional zstandard package, gzip is always there
+is_zstd_supported = importlib.util.find_spec("zstandard") is not None
+
+
+def load_settings(sim_cfg: dict) -> dict:
+    settings = dict(default_settings)
+    for k, v in ((sim_cfg or dict()).get("artifacts") or dict()).items():
+        assert k in default_settings, "Error: unknown artifacts setting {}".format(k)
+        settings[k] = v
+    settings["compress"] = settings["compress"] or "none"
+    assert (
+        settings["compress"] == "none" or settings["compress"] in codec_ext
+    ), "Error: unknown codec {}".format(settings["compress"])
+    if settings["compress"] == "zstd" and not is_zstd_supported:
+        print("zstandard not installed, artifacts are compressed with gzip")
+        settings["compress"] = "gzip"
+    return settings
+
+
+def open_compressed(filename: str, codec: str, level=None):
+    if codec == "zstd":
+        import zstandard
+
+        c_ = zstandard.ZstdCompressor(level=3 if level is None else level)
+        return c_.stream_writer(open(filename, "wb"), closefd=True)
+    return gzip.open(filename, "wb", compresslevel=6 if level is None else level)
+
+
+# text of an artifact, whether it was compressed or not
+def open_artifact(filename: str):
+    for ext in codec_ext.values():
+        if filename.endswith(ext):
+            filename = filename[: -len(ext)]
+    if os.path.exists(filename):
+        return open(filename)
+    if os.path.exists(filename + codec_ext["gzip"]):
+        return gzip.open(filename + codec_ext["gzip"], "rt")
+    if os.path.exists(filename + codec_ext["zstd"]):
+        import zstandard
+
+        f = open(filename + codec_ext["zstd"], "rb")
+        return io.TextIOWrapper(zstandard.ZstdDecompressor().stream_reader(f))
+    raise FileNotFoundError("Error: no artifact {}".format(filename))
+
+
+# compress a file next to it and remove it; links, symbolic or hard ones into
+# the pattern cache, and pipes are left alone as they take no space of their own
+def compress_file(filename: str, codec: str, level=None) -> str:
+    st = os.lstat(filename)
+    if not stat.S_ISREG(st.st_mode) or st.st_nlink > 1:
+        return None
+    out_file = filename + codec_ext[codec]
+    with open(filename, "rb") as f_in, open_compressed(
+        out_file + ".tmp", codec, level
+    ) as f_out:
+        shutil.copyfileobj(f_in, f_out, block_size)
+    os.replace(out_file + ".tmp", out_file)
+    os.remove(filename)
+    return out_file
+
+
+# line numbers of the first max_n mismatches by f_diff, and of the line after
+# the end of the shorter file if the line counts differ
+def mismatch_lines(golden: str, dump: str, f_diff, max_n: int) -> list:
+    lines = list()
+    with open(golden) as f_g, open(dump) as f_d, verif_utils.quiet_output():
+        for line_id, (lg, ld) in enumerate(zip_longest(f_g, f_d), 1):
+            if len(lines) >= max_n:
+                break
+            if lg is None or ld is None:
+                lines.append(line_id)
+                break
+            if f_diff(lg.strip().lower(), ld.strip().lower(), line_id) > 0:
+                lines.append(line_id)
+    return lines
+
+
+def windows_name(dump: str) -> str:
+    root, ext = os.path.splitext(dump)
+    return root + windows_suffix + ext
+
+
+# the dump lines around the given mismatches, overlapping windows merged, with
+# the expected line next to each mismatch
+def write_windows(golden: str, dump: str, lines: list, window: int) -> str:
+    spans = list()
+    for l_ in lines:
+        if len(spans) > 0 and l_ - window <= spans[-1][1] + 1:
+            spans[-1][1] = l_ + window
+        else:
+            spans.append([max(l_ - window, 1), l_ + window])
+    is_mismatch = set(lines)
+    out_file = windows_name(dump)
+    with open(golden) as f_g, open(dump) as f_d, open(out_file, "w") as f:
+        f.write(
+            "# +-{} lines around the first {} mismatches of {}\n".format(
+                window, len(lines), os.path.basename(dump)
+            )
+        )
+        k = 0
+        for line_id, (lg, ld) in enumerate(zip_longest(f_g, f_d), 1):
+            while k < len(spans) and spans[k][1] < line_id:
+                k += 1
+            if k == len(spans):
+                break
+            if line_id < spans[k][0]:
+                continue
+            if line_id == spans[k][0]:
+                f.write("@@ lines {}-{}\n".format(*spans[k]))
+            ld = "<none>" if ld is None else ld.strip()
+            if line_id in is_mismatch:
+                lg = "<none>" if lg is None else lg.strip()
+                f.write("{:>9}! {}  expected {}\n".format(line_id, ld, lg))
+            else:
+                f.write("{:>9}  {}\n".format(line_id, ld))
+    return out_file
+
+
+# shrink the artifacts of a finished case: a passing case keeps its dump and
+# logs compressed, a failing one only the windows of its dump around the first
+# mismatches, and its logs as they are for debugging
+def archive_case(
+    case_dir: str, golden: str, dump: str, cnt_err: int, f_diff, settings: dict
+) -> None:
+    if cnt_err > 0:
+        if settings["max_windows"] <= 0 or not os.path.isfile(golden):
+            return  # the windows need the golden patterns as text
+        if not os.path.isfile(dump) or os.path.islink(dump):
+            return  # streamed through a pipe
+        lines = mismatch_lines(golden, dump, f_diff, settings["max_windows"])
+        if len(lines) == 0:
+            return  # failed otherwise, e.g. by a comparator mode with a model
+        write_windows(golden, dump, lines, settings["window"])
+        os.remove(dump)
+        return
+    if settings["compress"] == "none":
+        return
+    for _f in os.listdir(case_dir):  # links and pipes are skipped
+        _p = os.path.join(case_dir, _f)
+        if _p == dump or os.path.splitext(_f)[1] in log_ext:
+            compress_file(_p, settings["compress"], settings["level"])
+
+
+# print compressed artifacts, also zstd ones without the zstd tool
+if __name__ == "__main__":
+    for _f in sys.argv[1:]:
+        with open_artifact(_f) as f:
+            shutil.copyfileobj(f, sys.stdout)
@@ -0,0 +1,64 @@
+import os
+import sys
+import time
+import argparse
+import tempfile
+import numpy as np
+import cordic_model
+import pat_gen_cordic
+import pat_comp_cordic
+import pat_stats
+
+
+# bit-exact model against the ideal golden of the same generated patterns,
+# i.e. the accuracy the comparator tolerance has to cover
+def screen_case(n_pat: int, cordic_mode: str, seed: int) -> dict:
+    pat_cfg = {
+        "n_pat": n_pat,
+        "cordic_mode": cordic_mode,
+        "ampl": {"mode": "random", "range": [0x0FFF, 0x3FFF]},
+        "theta_init": {"mode": "random", "range": [0x0000, 0xFFFF]},
+        "seed": seed,
+    }
+    pg = pat_gen_cordic.pattern_generator(pat_cfg)
+    pat_in, pat_out = pg.gen_patterns(pg.gen_vars(0, n_pat))
+    t0 = time.perf_counter()
+    model_out = cordic_model.cordic_top(*pat_in)
+    result = {"time": time.perf_counter() - t0}
+    err = pat_stats.abs_error(
+        np.stack(pat_out, axis=1), np.stack(model_out, axis=1), cordic_model.w_data
+    )
+    result["fields"] = pat_stats.field_stats(
+        err, pat_comp_cordic.field_names, pat_comp_cordic.thr_err
+    )
+    return result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Screen the bit-exact CORDIC model against the ideal golden"
+    )
+    parser.add_argument("-n", dest="n_pat", type=int, nargs="+", default=[1000000])
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    n_fail = 0
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        os.chdir(tmp_dir)  # the generator writes its sim.tcl
+        for n in args.n_pat:
+            for m in ["vector", "rotate"]:
+                r = screen_case(n, m, args.seed)
+                f_ = r["fields"]
+                n_fail += sum(v["n_err"] for v in f_.values())
+                print(
+                    "{:<6} n_pat={:>10}: model {:7.3f} s ({:6.2f} M/s), "
+                    "max error {}, over threshold {}".format(
+                        m,
+                        n,
+                        r["time"],
+                        n / r["time"] / 1e6,
+                        "/".join(str(v["max_abs"]) for v in f_.values()),
+                        "/".join(str(v["n_err"]) for v in f_.values()),
+                    )
+                )
+    if n_fail > 0:
+        sys.exit("Model exceeds the comparator tolerance")
@@ -0,0 +1,92 @@
+import time
+import argparse
+from math import ceil
+import numpy as np
+import hex_codec
+
+
+# former per-call helpers, kept only for comparison (base fixed to 16)
+def legacy_int2hex(intval: int, width: int) -> str:
+    tmp = intval
+    if intval < 0:
+        tmp += 1 << width
+    mask = (1 << width) - 1
+    tmp &= mask
+    fmt = "{{:0{}x}}".format(ceil(width / 4))
+    return fmt.format(tmp)
+
+
+def legacy_hex2int(hexstr: str, width: int) -> int:
+    value = int(hexstr, 16)
+    if value & (1 << (width - 1)):
+        value -= 1 << width
+    return value
+
+
+def timed(func) -> tuple:
+    t0 = time.perf_counter()
+    result = func()
+    return time.perf_counter() - t0, result
+
+
+def bench_width(n_val: int, width: int) -> dict:
+    rng = np.random.default_rng(width)
+    value = rng.integers(-(1 << (width - 1)), 1 << (width - 1), (n_val, 3))
+    scalar = value.ravel().tolist()
+    result = {"width": width}
+    result["legacy_enc"], hex_l = timed(
+        lambda: [legacy_int2hex(v, width) for v in scalar]
+    )
+    result["legacy_dec"], val_l = timed(
+        lambda: [legacy_hex2int(h, width) for h in hex_l]
+    )
+    enc, dec = hex_codec.encoder(width), hex_codec.decoder(width)
+    result["scalar_enc"], hex_s = timed(lambda: [enc(v) for v in scalar])
+    result["scalar_dec"], val_s = timed(lambda: [dec(h) for h in hex_s])
+    result["vector_enc"], text = timed(
+        lambda: hex_codec.encode_lines(value.T, [width] * 3)
+    )
+    result["vector_dec"], val_v = timed(lambda: hex_codec.decode_lines(text, width))
+    assert hex_l == hex_s == text.decode().split(), "Error: encoders differ"
+    assert val_l == val_s == val_v.ravel().tolist(), "Error: decoders differ"
+    return result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Hex codec microbenchmark")
+    parser.add_argument("-n", dest="n_val", type=int, default=100000)
+    parser.add_argument(
+        "-w", dest="width", type=int, nargs="+", default=[8, 12, 16, 24, 32]
+    )
+    args = parser.parse_args()
+    print("{} lines of 3 values, times in ms".format(args.n_val))
+    fmt = "{:>6} {:>10} {:>10} {:>10} {:>10} {:>10} {:>10} {:>8}"
+    print(
+        fmt.format(
+            "width",
+            "legacy_e",
+            "legacy_d",
+            "scalar_e",
+            "scalar_d",
+            "vector_e",
+            "vector_d",
+            "speedup",
+        )
+    )
+    for w in args.width:
+        r = bench_width(args.n_val, w)
+        t_legacy = r["legacy_enc"] + r["legacy_dec"]
+        t_vector = r["vector_enc"] + r["vector_dec"]
+        ms = lambda k_: "{:.1f}".format(r[k_] * 1e3)
+        print(
+            fmt.format(
+                w,
+                ms("legacy_enc"),
+                ms("legacy_dec"),
+                ms("scalar_enc"),
+                ms("scalar_dec"),
+                ms("vector_enc"),
+                ms("vector_dec"),
+                "{:.1f}x".format(t_legacy / t_vector),
+            )
+        )
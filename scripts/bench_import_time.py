@@ -0,0 +1,95 @@
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+import subprocess
+
+script_dir = os.path.dirname(os.path.realpath(__file__))
+repo_root = os.path.realpath(os.path.join(script_dir, ".."))
+heavy_modules = ["numpy", "ruamel.yaml"]  # imports that should stay lazy
+
+
+# import time of a module in a fresh interpreter, in ms, with the cumulative
+# time of the heavy modules it pulls in
+def import_time(module: str) -> dict:
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import " + module],
+        cwd=script_dir,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    result = {"heavy": dict()}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        if not cumulative.strip().isdigit():
+            continue  # column header
+        name = name.strip()
+        if name == module:
+            result["total"] = int(cumulative) / 1e3
+        elif name in heavy_modules:
+            result["heavy"][name] = int(cumulative) / 1e3
+    return result
+
+
+# best wall time of running main.py in a module directory, in ms
+def cli_time(op: str, module_dir: str, repeat: int, clear_cache: bool) -> float:
+    import vivado_tools as vt
+
+    config_cache = os.path.join(
+        module_dir, vt.build_cache.build_dir_name, vt.config_cache_name
+    )
+    times = list()
+    for _ in range(repeat):
+        if clear_cache and os.path.exists(config_cache):
+            os.remove(config_cache)
+        t0 = time.perf_counter()
+        subprocess.run(
+            [sys.executable, os.path.join(script_dir, "main.py"), op, "-m", "path"],
+            cwd=module_dir,
+            stdout=subprocess.DEVNULL,
+            check=True,
+        )
+        times.append(time.perf_counter() - t0)
+    return min(times) * 1e3
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Import time and CLI startup of the toolchain"
+    )
+    parser.add_argument(
+        "-i",
+        dest="modules",
+        type=str,
+        nargs="+",
+        default=["main", "vivado_tools", "verif_utils", "regress", "pat_gen_cordic"],
+    )
+    parser.add_argument("-m", dest="module", type=str, default="cordic")
+    parser.add_argument("-r", dest="repeat", type=int, default=5)
+    args = parser.parse_args()
+    sys.path.insert(0, script_dir)
+    print("{:<20} {:>10}  {}".format("Import", "Time(ms)", "heavy modules"))
+    for m_ in args.modules:
+        r_ = min(
+            (import_time(m_) for _ in range(args.repeat)), key=lambda r: r["total"]
+        )
+        heavy = ", ".join("{} {:.1f}".format(k, v) for k, v in r_["heavy"].items())
+        print("{:<20} {:>10.1f}  {}".format(m_, r_["total"], heavy or "-"))
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        # a copy of the module, so that its build directory is left alone
+        m_dir = os.path.join(tmp_dir, args.module)
+        shutil.copytree(
+            os.path.join(repo_root, args.module),
+            m_dir,
+            ignore=shutil.ignore_patterns("work_*", "build"),
+        )
+        print("{:<20} {:>10}  {:>10}".format("Operation", "Cold(ms)", "Cached(ms)"))
+        for op in ["runs", "cache"]:
+            cold = cli_time(op, m_dir, args.repeat, clear_cache=True)
+            warm = cli_time(op, m_dir, args.repeat, clear_cache=False)
+            print("{:<20} {:>10.1f}  {:>10.1f}".format(op, cold, warm))
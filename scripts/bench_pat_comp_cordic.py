@@ -0,0 +1,57 @@
+import io
+import os
+import time
+import argparse
+import tempfile
+import contextlib
+import numpy as np
+import hex_codec
+import pat_comp_cordic
+
+w_data = pat_comp_cordic.w_data
+
+
+# golden file plus a dump in the testbench hwrite layout with a few injected errors
+def gen_dump_pair(n_line: int, n_err: int, seed: int = 0) -> None:
+    rng = np.random.RandomState(seed)
+    golden = rng.randint(-(1 << (w_data - 1)), 1 << (w_data - 1), (n_line, 3))
+    dump = golden + rng.randint(-3, 4, golden.shape)
+    err_lines = rng.choice(n_line, min(n_err, n_line), replace=False)
+    dump[err_lines, 0] += 100
+    with open("pat_out.txt", "w") as f:
+        f.write(hex_codec.encode_lines(golden.T, [w_data] * 3).decode())
+    with open("dut_out.txt", "w") as f:
+        lines = hex_codec.encode_lines(dump.T, [w_data] * 3).decode().upper()
+        f.write(" " + lines.replace("\n", "\n ")[:-1])
+
+
+def time_mode(mode: str) -> tuple:
+    t0 = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        cnt_err = pat_comp_cordic.pattern_comparator(
+            "pat_out.txt", "dut_out.txt", comp_mode=mode
+        ).run()
+    return time.perf_counter() - t0, cnt_err
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="CORDIC pattern comparator benchmark")
+    parser.add_argument(
+        "-n", dest="n_line", type=int, nargs="+", default=[72000, 10000000]
+    )
+    parser.add_argument("-e", dest="n_err", type=int, default=100)
+    parser.add_argument("--line-max", dest="line_max", type=int, default=1000000)
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        os.chdir(tmp_dir)
+        for n in args.n_line:
+            gen_dump_pair(n, args.n_err)
+            t_bulk, e_bulk = time_mode("bulk")
+            msg = "n_line={:>10}: bulk {:8.3f} s ({} errors)".format(n, t_bulk, e_bulk)
+            if n <= args.line_max:
+                t_line, e_line = time_mode("line")
+                assert e_line == e_bulk, "Error: line/bulk results differ"
+                msg += ", line {:8.3f} s, speedup {:6.1f}x".format(
+                    t_line, t_line / t_bulk
+                )
+            print(msg)
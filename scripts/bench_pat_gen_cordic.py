@@ -0,0 +1,113 @@
+import os
+import time
+import argparse
+import tempfile
+import numpy as np
+import verif_utils
+import pat_gen_cordic
+
+w_data = pat_gen_cordic.w_data
+
+
+# scalar reference kept only for comparison, equivalent to the former per-pattern loop
+def legacy_run(pat_cfg: dict) -> None:
+    var_dict = pat_gen_cordic.pattern_generator(pat_cfg).gen_vars(0, pat_cfg["n_pat"])
+    with open("pat_in.txt", "w") as f_in, open("pat_out.txt", "w") as f_out:
+        f_in.write("# mode, x, y, theta\n")
+        for i in range(pat_cfg["n_pat"]):
+            mode = 1 if pat_cfg["cordic_mode"] == "vector" else 0
+            phase_i = var_dict["theta"][i] if mode == 1 else var_dict["theta_init"][i]
+            phase_o = (
+                0
+                if mode == 1
+                else (
+                    (var_dict["theta"][i] + var_dict["theta_init"][i])
+                    & ((1 << w_data) - 1)
+                )
+            )
+            x_i = int(
+                float(var_dict["ampl"][i])
+                * np.cos(2 * np.pi * float(phase_i) / (2**w_data))
+            )
+            y_i = int(
+                float(var_dict["ampl"][i])
+                * np.sin(2 * np.pi * float(phase_i) / (2**w_data))
+            )
+            theta_i = 0 if mode == 1 else var_dict["theta"][i]
+            theta_o = var_dict["theta"][i] if mode == 1 else 0
+            f_in.write(
+                "{} {} {} {}\n".format(
+                    mode,
+                    verif_utils.int2hex(x_i, w_data),
+                    verif_utils.int2hex(y_i, w_data),
+                    verif_utils.int2hex(theta_i, w_data),
+                )
+            )
+            lsh = 0
+            if mode == 1:
+                op_hi = int(1 << (w_data - 3)) - 1
+                op_lo = -int(1 << (w_data - 3))
+                while (op_lo <= x_i <= op_hi) and (op_lo <= y_i <= op_hi):
+                    x_i *= 2
+                    y_i *= 2
+                    lsh += 1
+            x_o = int(
+                float(var_dict["ampl"][i] << lsh)
+                * np.cos(2 * np.pi * float(phase_o) / (2**w_data))
+            )
+            y_o = int(
+                float(var_dict["ampl"][i] << lsh)
+                * np.sin(2 * np.pi * float(phase_o) / (2**w_data))
+            )
+            f_out.write(
+                "{} {} {}\n".format(
+                    verif_utils.int2hex(x_o, w_data),
+                    verif_utils.int2hex(y_o, w_data),
+                    verif_utils.int2hex(theta_o, w_data),
+                )
+            )
+
+
+def bench_case(n_pat: int, legacy_max: int, gen_jobs: int = 1) -> dict:
+    pat_cfg = {
+        "timeout": "20 ms",
+        "n_pat": n_pat,
+        "cordic_mode": "vector",
+        "ampl": {"mode": "random", "range": [0x0FFF, 0x3FFF], "seed": 123},
+    }
+    result = {"n_pat": n_pat}
+    t0 = time.perf_counter()
+    pat_gen_cordic.pattern_generator(dict(pat_cfg, gen_jobs=gen_jobs)).run()
+    result["vectorized"] = time.perf_counter() - t0
+    # the scalar loop is too slow for huge sizes, so time a slice and extrapolate
+    n_legacy = min(n_pat, legacy_max)
+    t0 = time.perf_counter()
+    legacy_run(dict(pat_cfg, n_pat=n_legacy))
+    result["legacy"] = (time.perf_counter() - t0) * n_pat / n_legacy
+    result["extrapolated"] = n_legacy < n_pat
+    return result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="CORDIC pattern generator benchmark")
+    parser.add_argument(
+        "-n", dest="n_pat", type=int, nargs="+", default=[72000, 10000000]
+    )
+    parser.add_argument("--legacy-max", dest="legacy_max", type=int, default=72000)
+    parser.add_argument(
+        "-j", dest="gen_jobs", type=int, default=1, help="generator processes"
+    )
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        os.chdir(tmp_dir)
+        for n in args.n_pat:
+            r = bench_case(n, args.legacy_max, args.gen_jobs)
+            print(
+                "n_pat={:>10}: vectorized {:8.3f} s, legacy {:8.3f} s{}, speedup {:6.1f}x".format(
+                    r["n_pat"],
+                    r["vectorized"],
+                    r["legacy"],
+                    " (est.)" if r["extrapolated"] else "",
+                    r["legacy"] / r["vectorized"],
+                )
+            )
@@ -0,0 +1,279 @@
+import io
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import subprocess
+import contextlib
+from fnmatch import fnmatch
+import numpy as np
+import verif_utils
+import hex_codec
+import comp_service
+import perf_utils
+import pat_gen_cordic
+import pat_comp_cordic
+import cordic_model
+import vivado_tools as vt
+import bench_pat_comp_cordic
+
+repo_root = os.path.realpath(os.path.join(os.path.dirname(__file__), ".."))
+stub_tools = {
+    "xvhdl": 'mkdir -p xsim.dir/work\necho "INFO: stub compile $*" > xvhdl.log\n',
+    "xelab": 'snap=""; prev=""\n'
+    'for a in "$@"; do [ "$prev" = "-s" ] && snap=$a; prev=$a; done\n'
+    'mkdir -p xsim.dir/$snap\necho "INFO: stub elaborate $*" > xelab.log\n',
+    # batch mode with -t, otherwise a tcl session on stdin as used by sim_worker
+    "xsim": 'case " $* " in *" -t "*)\n'
+    '  cp pat_out.txt dut_out.txt; echo "INFO: stub sim $*" > xsim.log; exit 0;;\n'
+    "esac\n"
+    "while read -r cmd arg rest; do case $cmd in\n"
+    '  cd) arg=${arg#\\{}; cd "${arg%\\}}";;\n'
+    '  run) cp pat_out.txt dut_out.txt; echo "INFO: stub run $arg $rest";;\n'
+    '  puts) echo "$arg";;\n'
+    "  quit|exit) exit 0;;\n"
+    "esac; done\n",
+}
+
+
+# stand-in vivado tools on PATH, used with the "path" running mode
+def install_stub_tools(bin_dir: str) -> None:
+    os.makedirs(bin_dir, exist_ok=True)
+    for name, body in stub_tools.items():
+        tool = os.path.join(bin_dir, name)
+        with open(tool, "w") as f:
+            f.write("#!/bin/sh\n" + body)
+        os.chmod(tool, 0o755)
+    os.environ["PATH"] = bin_dir + os.pathsep + os.environ["PATH"]
+
+
+# synthetic repo of n_module modules, each depending on up to two earlier ones
+def gen_synthetic_repo(repo_dir: str, n_module: int) -> str:
+    for i in range(n_module):
+        m_dir = os.path.join(repo_dir, "m{}".format(i))
+        os.makedirs(os.path.join(m_dir, "rtl"))
+        with open(os.path.join(m_dir, "rtl", "m{}.vhd".format(i)), "w") as f:
+            f.write("-- m{}\n".format(i))
+        subs = ["m{}".format(j) for j in sorted({i // 2, i - 1}) if 0 <= j < i]
+        with open(os.path.join(m_dir, "config.yml"), "w") as f:
+            f.write("src_list:\n  rtl:\n    - m{}.vhd\n  tb: null\n".format(i))
+            f.write("submodules: [{}]\n".format(", ".join(subs)))
+            f.write("sim: null\n")
+    return os.path.join(repo_dir, "m{}".format(n_module - 1))
+
+
+def bench_pat_gen(n_pat: int):
+    pat_cfg = {
+        "n_pat": n_pat,
+        "cordic_mode": "vector",
+        "ampl": {"mode": "random", "range": [0x0FFF, 0x3FFF], "seed": 123},
+    }
+    return lambda: pat_gen_cordic.pattern_generator(dict(pat_cfg)).run()
+
+
+def bench_check_pat_diff(n_line: int):
+    bench_pat_comp_cordic.gen_dump_pair(n_line, 10)
+    shutil.copyfile("pat_out.txt", "dut_out.txt")  # exact match for the plain line diff
+    return lambda: verif_utils.check_pat_diff("pat_out.txt", "dut_out.txt")
+
+
+# line diff of a golden file in byte range chunks on n_jobs processes
+def bench_comp_service(n_line: int, n_jobs: int):
+    bench_pat_comp_cordic.gen_dump_pair(n_line, 10)
+    shutil.copyfile("pat_out.txt", "dut_out.txt")
+    comp_service.min_chunk = 1 << 16
+    return lambda: comp_service.check_pairs(
+        [("pat_out.txt", "dut_out.txt")], n_jobs=n_jobs
+    )
+
+
+def bench_comp_cordic(n_line: int, mode: str):
+    bench_pat_comp_cordic.gen_dump_pair(n_line, 10)
+
+    return lambda: pat_comp_cordic.pattern_comparator(
+        "pat_out.txt", "dut_out.txt", comp_mode=mode
+    ).run()
+
+
+def bench_cordic_model(n_pat: int):
+    value = np.random.RandomState(0).randint(-(1 << 15), 1 << 15, (4, n_pat))
+    return lambda: cordic_model.cordic_top(*value)
+
+
+def bench_hex_codec(n_val: int, vectorized: bool = False):
+    value = np.random.RandomState(0).randint(-(1 << 15), 1 << 15, n_val)
+
+    def run():
+        if vectorized:
+            hex_codec.decode_lines(hex_codec.encode_lines([value], [16]), 16)
+        else:
+            for v in value.tolist():
+                verif_utils.signed_hex2int(verif_utils.int2hex(v, 16), 16)
+
+    return run
+
+
+def bench_module_config(n_module: int):
+    top_dir = gen_synthetic_repo(os.path.realpath("repo_{}".format(n_module)), n_module)
+
+    def run():
+        vt.module_config_memo.clear()
+        cfg = vt.parse_module_config(module_root=top_dir)
+        vt.resolve_rtl_hier(cfg)
+
+    return run
+
+
+# startup of a fresh interpreter importing a toolchain module
+def bench_import(module: str):
+    cmd = [sys.executable, "-c", "import " + module]
+    return lambda: subprocess.run(cmd, cwd=os.path.dirname(__file__), check=True)
+
+
+def bench_module_simulate(module: str, n_jobs: int, mode: str = "path"):
+    if mode == "path":
+        install_stub_tools(os.path.realpath("stub_bin"))
+    n_run = [0]
+
+    def run():
+        # a fresh copy per run, so neither work dirs nor caches are shared
+        n_run[0] += 1
+        perf_utils.perf_records.clear()
+        m_dir = os.path.realpath("{}_{}_{}_{}".format(module, mode, n_jobs, n_run[0]))
+        shutil.copytree(
+            os.path.join(repo_root, module),
+            m_dir,
+            ignore=shutil.ignore_patterns(vt.work_dir_prefix + "*", "build"),
+        )
+        cfg = vt.parse_module_config(module_root=m_dir)
+        vt.create_vivado_dir(cfg, vivado_mode=mode)
+        vt.module_compile(cfg, w_tb=True)
+        vt.module_elaborate(cfg)
+        vt.module_simulate(cfg, n_jobs=n_jobs)
+
+    return run
+
+
+def bench_list(quick: bool) -> list:
+    scale = 10 if quick else 1
+    n_gen = [n // scale for n in [10000, 100000, 1000000]]
+    n_comp = [n // scale for n in [100000, 1000000]]
+    n_val = 100000 // scale
+    benches = [("pat_gen_cordic/n={}".format(n), bench_pat_gen, n) for n in n_gen]
+    for n in n_comp:
+        benches += [
+            ("check_pat_diff/n={}".format(n), bench_check_pat_diff, n),
+            ("comp_service/n={}/j=4".format(n), bench_comp_service, n, 4),
+            ("line_comp_cordic/n={}".format(n), bench_comp_cordic, n, "line"),
+            ("bulk_comp_cordic/n={}".format(n), bench_comp_cordic, n, "bulk"),
+        ]
+    for n in n_comp:
+        benches.append(("cordic_model/n={}".format(n), bench_cordic_model, n))
+    benches.append(("hex_codec/n={}".format(n_val), bench_hex_codec, n_val))
+    benches.append(("hex_codec_vec/n={}".format(n_val), bench_hex_codec, n_val, True))
+    for n in [10, 200]:
+        benches.append(("module_config/modules={}".format(n), bench_module_config, n))
+    for m_ in ["main", "vivado_tools", "regress"]:
+        benches.append(("import/{}".format(m_), bench_import, m_))
+    if os.name != "nt":  # stub tools are shell scripts
+        for j in [1, 4]:
+            name = "module_simulate/cordic/j={}".format(j)
+            benches.append((name, bench_module_simulate, "cordic", j))
+    for j in [1, 4]:  # the fake backend also writes and compares the dumps
+        name = "module_simulate/cordic/fake/j={}".format(j)
+        benches.append((name, bench_module_simulate, "cordic", j, "fake"))
+    return benches
+
+
+# best wall time of several repeats, the setup is not timed
+def run_bench(setup, args: tuple, repeat: int) -> dict:
+    with contextlib.redirect_stdout(io.StringIO()):
+        func = setup(*args)
+        times = list()
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            func()
+            times.append(time.perf_counter() - t0)
+    return {"time": min(times), "mean": sum(times) / len(times), "repeat": repeat}
+
+
+def compare_baseline(results: dict, baseline: dict, tolerance: float) -> list:
+    regressions = list()
+    fmt = "{:<40} {:>10} {:>10} {:>8}  {}"
+    print(fmt.format("Benchmark", "Base(s)", "Now(s)", "Ratio", ""))
+    for name, r_ in results.items():
+        if name not in baseline:
+            print(fmt.format(name, "-", "{:.4f}".format(r_["time"]), "-", "new"))
+            continue
+        ratio = r_["time"] / max(baseline[name]["time"], 1e-9)
+        is_slow = ratio > 1 + tolerance
+        if is_slow:
+            regressions.append(name)
+        flag = verif_utils.ascii_colorize("REGRESSION", "red") if is_slow else ""
+        print(
+            fmt.format(
+                name,
+                "{:.4f}".format(baseline[name]["time"]),
+                "{:.4f}".format(r_["time"]),
+                "{:.2f}".format(ratio),
+                flag,
+            )
+        )
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Benchmark suite of the verification scripts"
+    )
+    parser.add_argument(
+        "-o", dest="output", type=str, help="write results to a json file"
+    )
+    parser.add_argument(
+        "-b", dest="baseline", type=str, help="compare with a baseline json file"
+    )
+    parser.add_argument(
+        "-k", dest="pattern", type=str, default="*", help="benchmark name filter"
+    )
+    parser.add_argument(
+        "-r", dest="repeat", type=int, default=3, help="repeats per benchmark"
+    )
+    parser.add_argument(
+        "-t",
+        dest="tolerance",
+        type=float,
+        default=0.2,
+        help="allowed slowdown vs baseline",
+    )
+    parser.add_argument("--quick", action="store_true", help="smaller problem sizes")
+    args = parser.parse_args()
+    for k_ in ["output", "baseline"]:
+        if getattr(args, k_) is not None:
+            setattr(args, k_, os.path.realpath(getattr(args, k_)))
+    results = dict()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        os.chdir(tmp_dir)
+        for name, setup, *b_args in bench_list(args.quick):
+            if not fnmatch(name, args.pattern):
+                continue
+            results[name] = run_bench(setup, tuple(b_args), args.repeat)
+            print("{:<40} {:>10.4f} s".format(name, results[name]["time"]))
+    report = {
+        "commit": perf_utils.git_commit(repo_root),
+        "time": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "benchmarks": results,
+    }
+    if args.output is not None:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.baseline is not None:
+        with open(args.baseline) as f:
+            baseline = json.load(f)["benchmarks"]
+        if len(compare_baseline(results, baseline, args.tolerance)) > 0:
+            sys.exit("Benchmarks slower than baseline!")
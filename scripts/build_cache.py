@@ -0,0 +1,115 @@
+import os
+import json
+import shutil
+import hashlib
+import os_utils
+
+build_dir_name = "build"
+cache_name = "build_cache.json"
+lock_name = "build.lock"
+snapshot_dir_name = "snapshots"  # a copy of the snapshot per elaboration key
+
+
+# content hash of a source file
+def file_hash(filename: str) -> str:
+    h = hashlib.sha256()
+    with open(filename, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def key_hash(*items) -> str:
+    return hashlib.sha256(json.dumps(items).encode()).hexdigest()
+
+
+def load_cache(build_dir: str) -> dict:
+    cache_file = os.path.join(build_dir, cache_name)
+    if not os.path.exists(cache_file):
+        return dict()
+    with open(cache_file) as f:
+        try:
+            return json.load(f)
+        except ValueError:
+            return dict()  # corrupted cache is treated as empty
+
+
+def save_cache(build_dir: str, cache: dict) -> None:
+    cache_file = os.path.join(build_dir, cache_name)
+    with open(cache_file + ".tmp", "w") as f:
+        json.dump(cache, f, indent=2)
+    os.replace(cache_file + ".tmp", cache_file)
+
+
+# files to compile so that the library matches src_files, given in dependency order
+def plan_compile(cache: dict, src_files: list, comp_opt: str) -> tuple:
+    src_state = [[_f, file_hash(_f)] for _f in src_files]
+    prev = cache.get("compile", dict())
+    prev_state = prev.get("files", [])
+    prev_files = {s_[0] for s_ in prev_state}
+    if prev.get("opt") != comp_opt or not prev_files <= set(src_files):
+        return src_files, src_state, True  # full rebuild, no stale units in library
+    n_same = 0
+    for s_new, s_old in zip(src_state, prev_state):
+        if s_new != s_old:
+            break
+        n_same += 1
+    # everything after the first changed file may depend on it
+    return src_files[n_same:], src_state, False
+
+
+def update_compile(cache: dict, src_state: list, comp_opt: str) -> None:
+    cache["compile"] = {"opt": comp_opt, "files": src_state}
+
+
+def elab_key(cache: dict, elab_opt: str, top_name: str) -> str:
+    return key_hash(cache.get("compile"), elab_opt, top_name)
+
+
+def is_elab_valid(cache: dict, build_dir: str, elab_opt: str, top_name: str) -> bool:
+    snapshot = os.path.join(build_dir, "xsim.dir", "{}_sim".format(top_name))
+    return cache.get("elaborate") == elab_key(cache, elab_opt, top_name) and (
+        os.path.exists(snapshot)
+    )
+
+
+def update_elab(cache: dict, elab_opt: str, top_name: str) -> None:
+    cache["elaborate"] = elab_key(cache, elab_opt, top_name)
+
+
+# exclusive lock of a library while it is compiled, elaborated and published,
+# across the processes of concurrent sim and regress runs of the module
+def library_lock(build_dir: str):
+    return os_utils.file_lock(os.path.join(build_dir, lock_name))
+
+
+# copy of the elaborated snapshot that no later build touches, returns the
+# xsim.dir for the runs to link to
+def publish_snapshot(cache: dict, build_dir: str, top_name: str) -> str:
+    snapshot = "{}_sim".format(top_name)
+    key_dir = os.path.join(build_dir, snapshot_dir_name, cache["elaborate"][:16])
+    if not os.path.exists(key_dir):
+        tmp_dir = key_dir + ".tmp"
+        if os.path.exists(tmp_dir):
+            shutil.rmtree(tmp_dir)  # left by an interrupted copy
+        shutil.copytree(
+            os.path.join(build_dir, "xsim.dir", snapshot),
+            os.path.join(tmp_dir, "xsim.dir", snapshot),
+            symlinks=True,
+        )
+        os.replace(tmp_dir, key_dir)
+    return os.path.join(key_dir, "xsim.dir")
+
+
+# remove the snapshot copies that none of the given xsim.dir paths is
+def evict_snapshots(build_dir: str, in_use: set) -> None:
+    snap_root = os.path.join(build_dir, snapshot_dir_name)
+    for _d in os.listdir(snap_root):
+        if os.path.realpath(os.path.join(snap_root, _d, "xsim.dir")) not in in_use:
+            shutil.rmtree(os.path.join(snap_root, _d))
+
+
+def clean_library(build_dir: str) -> None:
+    lib_dir = os.path.join(build_dir, "xsim.dir")
+    if os.path.exists(lib_dir):
+        shutil.rmtree(lib_dir)
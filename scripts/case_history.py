@@ -0,0 +1,82 @@
+import os
+import json
+import time
+import os_utils
+
+history_name = "case_history.json"
+lock_name = "case_history.lock"
+rank_fail, rank_new, rank_pass = 0, 1, 2  # schedule order by last outcome
+
+
+# outcome of the latest run of each sim case of a module, kept next to the
+# build libraries, by case name:
+#   status:   "pass" or "fail"
+#   wall:     duration of prepare, simulate and compare in seconds
+#   key:      hash of the inputs the case was run with
+#   pass_key: key of the inputs of the last pass, None after a failure
+#   run:      id of the run
+def history_file(build_dir: str) -> str:
+    return os.path.join(build_dir, history_name)
+
+
+def load_history(build_dir: str) -> dict:
+    if not os.path.exists(history_file(build_dir)):
+        return dict()
+    with open(history_file(build_dir)) as f:
+        try:
+            return json.load(f)
+        except ValueError:
+            return dict()  # corrupted history is treated as empty
+
+
+def save_history(build_dir: str, history: dict) -> None:
+    os.makedirs(build_dir, exist_ok=True)
+    tmp_file = "{}.{}.tmp".format(history_file(build_dir), os.getpid())
+    with open(tmp_file, "w") as f:
+        json.dump(history, f, indent=2)
+    os.replace(tmp_file, history_file(build_dir))
+
+
+# merge the outcomes of a run, given by case as status, wall (None if unknown)
+# and key
+def update_history(build_dir: str, outcomes: dict, run_id: str) -> None:
+    with os_utils.file_lock(os.path.join(build_dir, lock_name)):
+        history = load_history(build_dir)
+        for sim_case, o_ in outcomes.items():
+            prev = history.get(sim_case, dict())
+            history[sim_case] = {
+                "status": o_["status"],
+                "wall": (
+                    prev.get("wall") if o_["wall"] is None else round(o_["wall"], 4)
+                ),
+                "key": o_["key"],
+                "pass_key": o_["key"] if o_["status"] == "pass" else None,
+                "run": run_id,
+                "time": time.strftime("%Y-%m-%d %H:%M:%S"),
+            }
+        save_history(build_dir, history)
+
+
+def case_rank(history: dict, sim_case: str) -> int:
+    if sim_case not in history:
+        return rank_new
+    return rank_pass if history[sim_case]["status"] == "pass" else rank_fail
+
+
+# failing cases first, then new ones, then passing ones; with by_wall the
+# longest cases of each group first (LPT), cases of unknown duration count
+# as the longest, the config order breaks ties
+def schedule(case_list: list, history: dict, by_wall: bool = False) -> list:
+    def sort_key(c_):
+        wall = history.get(c_[0], dict()).get("wall")
+        return (
+            case_rank(history, c_[0]),
+            -(float("inf") if wall is None else wall) if by_wall else 0,
+        )
+
+    return sorted(case_list, key=sort_key)
+
+
+# the case passed with exactly these inputs the last time it ran
+def is_unchanged(history: dict, sim_case: str, key: str) -> bool:
+    return history.get(sim_case, dict()).get("pass_key") == key
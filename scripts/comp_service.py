@@ -0,0 +1,189 @@
+import os
+import atexit
+from bisect import bisect_right
+from concurrent.futures import ProcessPoolExecutor
+import verif_utils
+
+min_chunk = 1 << 22  # bytes, smaller golden files are compared in one piece
+chunks_per_job = 4  # finer chunks than jobs balance uneven mismatch printing
+block_size = 1 << 20  # bytes read at once when counting lines
+
+# one pool per process, shared by the comparisons of all cases and pairs
+shared_pool = {"pool": None, "n_jobs": 0}
+
+
+def get_pool(n_jobs: int) -> ProcessPoolExecutor:
+    if shared_pool["n_jobs"] < n_jobs:
+        if shared_pool["pool"] is not None:
+            shared_pool["pool"].shutdown()
+        shared_pool["pool"] = ProcessPoolExecutor(max_workers=n_jobs)
+        shared_pool["n_jobs"] = n_jobs
+    return shared_pool["pool"]
+
+
+def close_pool() -> None:
+    if shared_pool["pool"] is not None:
+        shared_pool["pool"].shutdown()
+    shared_pool["pool"], shared_pool["n_jobs"] = None, 0
+
+
+atexit.register(close_pool)
+
+
+# n_part byte ranges of a file, each starting at a line start
+def split_lines(filename: str, n_part: int) -> list:
+    size = os.path.getsize(filename)
+    offsets = [0]
+    with open(filename, "rb") as f:
+        for k in range(1, n_part):
+            f.seek(max(size * k // n_part - 1, offsets[-1]))
+            f.readline()  # to the start of the next line
+            if f.tell() < size and f.tell() > offsets[-1]:
+                offsets.append(f.tell())
+    return list(zip(offsets, offsets[1:] + [size]))
+
+
+def count_newlines(filename: str, start: int, end: int) -> int:
+    cnt = 0
+    with open(filename, "rb") as f:
+        f.seek(start)
+        while start < end:
+            block = f.read(min(block_size, end - start))
+            if not block:
+                break
+            cnt += block.count(b"\n")
+            start += len(block)
+    return cnt
+
+
+# byte offset and line number of each range start, and the number of lines,
+# where a last line without newline counts as a line like in text mode
+def line_index(pool, filename: str, n_part: int) -> tuple:
+    ranges = split_lines(filename, n_part)
+    counts = list(
+        (map if pool is None else pool.map)(
+            count_newlines, [filename] * len(ranges), *zip(*ranges)
+        )
+    )
+    first_line = [sum(counts[:k]) for k in range(len(ranges))]
+    n_line = sum(counts)
+    if ranges[-1][1] > 0:
+        with open(filename, "rb") as f:
+            f.seek(ranges[-1][1] - 1)
+            n_line += f.read(1) != b"\n"
+    return [r_[0] for r_ in ranges], first_line, n_line
+
+
+# compare n_line lines from given byte offsets, the dump skips d_skip lines
+# first; returns the error count and the first max_keep mismatches as (line,
+# errors, golden, dump), a chunk stops once it alone has max_err errors
+def compare_chunk(task: tuple, f_diff, max_err, max_keep: int) -> tuple:
+    golden, dump, g_off, d_off, d_skip, line0, n_line = task
+    cnt_err, mismatches = 0, list()
+    # the mismatches are printed by merge_pair, in line order
+    with open(golden, "rb") as f_g, open(dump, "rb") as f_d, verif_utils.quiet_output():
+        f_g.seek(g_off)
+        f_d.seek(d_off)
+        for _ in range(d_skip):
+            f_d.readline()
+        for line_id, lg, ld in zip(range(line0 + 1, line0 + n_line + 1), f_g, f_d):
+            lg, ld = lg.decode().strip().lower(), ld.decode().strip().lower()
+            e_ = f_diff(lg, ld, line_id)
+            if e_ > 0:
+                cnt_err += e_
+                if len(mismatches) < max_keep:
+                    mismatches.append((line_id, e_, lg, ld))
+                if max_err is not None and cnt_err >= max_err:
+                    break
+    return cnt_err, mismatches
+
+
+# chunk tasks of a golden/dump pair and its line counts, the lines are split
+# at the line starts of byte ranges of the golden file if it is large
+def plan_pair(pool, golden: str, dump: str, n_jobs: int) -> tuple:
+    n_part = min(n_jobs * chunks_per_job, os.path.getsize(golden) // min_chunk)
+    if n_part <= 1:
+        pool, n_part = None, 1  # counted in place, the pair is one task
+    g_off, g_first, n_g = line_index(pool, golden, n_part)
+    d_off, d_first, n_d = line_index(pool, dump, n_part)
+    n_cmp = min(n_g, n_d)
+    tasks = list()
+    for k, line0 in enumerate(g_first):
+        line1 = min(g_first[k + 1] if k + 1 < len(g_first) else n_g, n_cmp)
+        if line1 <= line0:
+            break
+        j = bisect_right(d_first, line0) - 1
+        tasks.append(
+            (golden, dump, g_off[k], d_off[j], line0 - d_first[j], line0, line1 - line0)
+        )
+    return (n_g, n_d), tasks
+
+
+# merge the chunks of a pair in line order, with the messages and the count
+# of check_pat_diff on the whole files
+def merge_pair(dump, n_lines, results, f_diff, max_err, max_print) -> int:
+    cnt_err, is_stopped = 0, False
+    mismatches = [m_ for r_ in results for m_ in r_[1]]
+    for line_id, e_, lg, ld in mismatches:
+        if max_err is not None and cnt_err >= max_err:
+            is_stopped = True
+            break
+        if cnt_err < max_print:
+            f_diff(lg, ld, line_id)
+        cnt_err += e_
+    else:
+        if max_err is not None and cnt_err >= max_err:
+            # the serial check only stops if there are lines left
+            last = mismatches[-1][0] if len(mismatches) > 0 else 0
+            is_stopped = last < max(n_lines)
+        else:
+            cnt_err = sum(r_[0] for r_ in results)
+    if is_stopped:
+        print(
+            verif_utils.ascii_colorize(
+                "Stopped after {} mismatches".format(cnt_err), color="red"
+            )
+        )
+    elif n_lines[0] != n_lines[1]:
+        print(
+            verif_utils.ascii_colorize(
+                "Mismatch at end: lines of expected {} != result {}".format(*n_lines),
+                color="red",
+            )
+        )
+        cnt_err += abs(n_lines[0] - n_lines[1])
+    verif_utils.print_diff_summary(dump, cnt_err, max_print)
+    return cnt_err
+
+
+# check golden/dump pairs with f_diff like check_pat_diff, the pairs and the
+# chunks of large files in parallel; pipes, or n_jobs of 1, are checked serially
+def check_pairs(
+    pairs: list,
+    f_diff=verif_utils.line_diff,
+    max_err=None,
+    max_print: int = 20,
+    n_jobs: int = 1,
+) -> list:
+    is_file = lambda p_: all(os.path.isfile(_f) for _f in p_)
+    if n_jobs <= 1 or not all(is_file(p_) for p_ in pairs):
+        return [
+            verif_utils.check_pat_diff(g_, d_, f_diff, max_err, max_print)
+            for g_, d_ in pairs
+        ]
+    pool = get_pool(n_jobs)
+    max_keep = max(max_print, 0 if max_err is None else max_err, 1)
+    planned = list()
+    for golden, dump in pairs:
+        n_lines, tasks = plan_pair(pool, golden, dump, n_jobs)
+        futures = [
+            pool.submit(compare_chunk, t_, f_diff, max_err, max_keep) for t_ in tasks
+        ]
+        planned.append((dump, n_lines, futures))
+    # reported pair by pair in the given order
+    return [
+        merge_pair(
+            dump, n_lines, [fut.result() for fut in futures], f_diff, max_err, max_print
+        )
+        for dump, n_lines, futures in planned
+    ]
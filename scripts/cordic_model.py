@@ -0,0 +1,107 @@
+from math import atan, sqrt, pi, floor
+from functools import lru_cache
+import numpy as np
+
+# generics of cordic_top, same defaults as the tb_pkg of the cordic module
+w_data = 16
+n_iter = 16
+w_ext = 4  # extra bits of the angle register, W_LUT = W_DATA + 4
+
+
+# two's complement wrap into a signed bus width, like numeric_std arithmetic
+def wrap(value, width: int):
+    half = 1 << (width - 1)
+    return ((value + half) & ((1 << width) - 1)) - half
+
+
+# real to integer conversion of VHDL, halves are rounded away from zero
+def vhdl_int(value: float) -> int:
+    return int(floor(abs(value) + 0.5)) * (1 if value >= 0 else -1)
+
+
+# ATAN_TABLE of cordic_core, in units of 2*pi / 2^W_LUT
+@lru_cache(maxsize=None)
+def atan_table(w_data: int = w_data, n_iter: int = n_iter) -> tuple:
+    w_lut = w_data + w_ext
+    return tuple(
+        wrap(vhdl_int(atan(2.0 ** (-i)) * 2.0**w_lut / (2 * pi)), w_lut)
+        for i in range(n_iter)
+    )
+
+
+# gain compensation K of cordic_core, a signed fraction of W_DATA bits
+@lru_cache(maxsize=None)
+def cordic_gain(w_data: int = w_data, n_iter: int = n_iter) -> int:
+    k = 1.0
+    for i in range(n_iter):
+        k *= 1.0 / sqrt(1.0 + 2.0 ** (-2 * i))
+    return wrap(vhdl_int(k * 2.0 ** (w_data - 1)), w_data)
+
+
+# cordic_lzsh: in vectoring mode, x and y are shifted left until the highest
+# non-sign bit of either one is at W_DATA-3, by at most W_DATA-3
+def lzsh(mode: np.ndarray, x: np.ndarray, y: np.ndarray, w_data: int = w_data):
+    # lowest bit i of the leading sign bit run, i.e. ld(i) = '1' and ld(i-1) = '0'
+    bit_len = lambda v: np.frexp(np.where(v < 0, ~v, v).astype(float))[1]
+    i_ld = np.maximum(bit_len(x), bit_len(y))
+    is_sh = (mode == 1) & (i_ld >= 1) & (i_ld <= w_data - 3)
+    shift = np.where(is_sh, w_data - 2 - i_ld, 0)
+    return wrap(x << shift, w_data), wrap(y << shift, w_data), shift
+
+
+# cordic_core from trigger to ready, all patterns at once: registers of W_DATA+1
+# (x, y) and W_LUT (theta) bits, n_iter iterations, then the gain adjustment
+def cordic_core(
+    mode: np.ndarray,
+    x: np.ndarray,
+    y: np.ndarray,
+    theta: np.ndarray,
+    w_data: int = w_data,
+    n_iter: int = n_iter,
+) -> tuple:
+    w_lut = w_data + w_ext
+    theta_pi = wrap(1 << (w_lut - 1), w_lut)  # to_signed(2^(W_LUT-1)) wraps to -pi
+    is_vec = mode == 1
+    # quadrant 2/3 inputs are mirrored (vectoring) or rotated by pi (rotation)
+    quad_rot = ((theta >> (w_data - 1)) ^ (theta >> (w_data - 2))) & 1 == 1
+    quad = np.where(is_vec, x < 0, quad_rot)
+    x_reg = wrap(np.where(quad, -x, x), w_data)
+    y_reg = wrap(np.where(~is_vec & quad, -y, y), w_data)
+    theta_ext = theta << w_ext
+    theta_reg = np.where(
+        is_vec, 0, np.where(quad, wrap(theta_ext - theta_pi, w_lut), theta_ext)
+    )
+    for i, atan_i in enumerate(atan_table(w_data, n_iter)):
+        is_neg = np.where(is_vec, y_reg >= 0, theta_reg < 0)
+        x_sh, y_sh = x_reg >> i, y_reg >> i
+        x_reg, y_reg = (
+            wrap(np.where(is_neg, x_reg + y_sh, x_reg - y_sh), w_data + 1),
+            wrap(np.where(is_neg, y_reg - x_sh, y_reg + x_sh), w_data + 1),
+        )
+        theta_reg = wrap(
+            np.where(is_neg, theta_reg + atan_i, theta_reg - atan_i), w_lut
+        )
+    # kx(kx'high-1 downto kx'high-1-W_DATA) of the 2*W_DATA+1 bit product
+    k = cordic_gain(w_data, n_iter)
+    x_end = wrap((k * x_reg) >> (w_data - 1), w_data + 1)
+    y_end = wrap((k * y_reg) >> (w_data - 1), w_data + 1)
+    theta_end = np.where(is_vec & quad, wrap(theta_pi - theta_reg, w_lut), theta_reg)
+    # outputs drop the extra register bits
+    return wrap(x_end, w_data), wrap(y_end, w_data), theta_end >> w_ext
+
+
+# cordic_top: the leading zero shifter in front of the core, for the columns of
+# pat_in.txt; returns the signed output columns of dut_out.txt
+def cordic_top(
+    mode: np.ndarray,
+    x: np.ndarray,
+    y: np.ndarray,
+    theta: np.ndarray,
+    w_data: int = w_data,
+    n_iter: int = n_iter,
+) -> tuple:
+    # inputs wrapped like the testbench reads them from hex
+    mode = np.asarray(mode, dtype=np.int64) & 1
+    x, y, theta = (wrap(np.asarray(c_, dtype=np.int64), w_data) for c_ in (x, y, theta))
+    x_sh, y_sh, _ = lzsh(mode, x, y, w_data)
+    return cordic_core(mode, x_sh, y_sh, theta, w_data, n_iter)
@@ -0,0 +1,136 @@
+from functools import lru_cache
+import numpy as np
+
+max_width = 64  # vectorized codec works on 64-bit lanes
+digits = np.frombuffer(b"0123456789abcdef", dtype=np.uint8)
+
+# ascii code to nibble value, 0xff for non-hex characters
+hex_lut = np.full(256, 0xFF, dtype=np.uint8)
+for _i, _c in enumerate(digits):
+    hex_lut[_c] = _i
+    hex_lut[ord(chr(_c).upper())] = _i
+ws_lut = np.zeros(256, dtype=bool)
+ws_lut[list(b" \t\r")] = True
+
+
+def n_nibble(width: int) -> int:
+    return (width + 3) // 4
+
+
+# mask and sign bit of a bus width
+@lru_cache(maxsize=None)
+def width_mask(width: int) -> tuple:
+    assert width > 0, "Error: invalid width {}".format(width)
+    return (1 << width) - 1, 1 << (width - 1)
+
+
+# scalar converters built once per width, bind them outside of hot loops
+@lru_cache(maxsize=None)
+def encoder(width: int):
+    fmt = "{{:0{}x}}".format(n_nibble(width)).format
+    mask, _ = width_mask(width)
+    return lambda value: fmt(value & mask)  # two's complement for negative values
+
+
+@lru_cache(maxsize=None)
+def decoder(width: int, signed: bool = True):
+    mask, sign = width_mask(width)
+    if not signed:
+        return lambda hexstr: int(hexstr, 16) & mask
+    return lambda hexstr: ((int(hexstr, 16) & mask) ^ sign) - sign
+
+
+def int2hex(value: int, width: int) -> str:
+    return encoder(width)(value)
+
+
+def hex2int(hexstr: str, width: int, signed: bool = True) -> int:
+    return decoder(width, signed)(hexstr)
+
+
+# smallest integer type of decoded values
+def value_dtype(width: int, signed: bool = True) -> np.dtype:
+    if signed:
+        return np.dtype(np.int32 if width <= 32 else np.int64)
+    return np.dtype(np.uint32 if width <= 32 else np.uint64)
+
+
+# two's complement bits of a column as 64-bit lanes, masked to the width
+def to_bits(col, width: int) -> np.ndarray:
+    assert width <= max_width, "Error: width {} > {}".format(width, max_width)
+    bits = np.asarray(col).astype(np.int64).view(np.uint64)
+    return bits & np.uint64(width_mask(width)[0])
+
+
+# masked bits back to values, sign extended from the width
+def from_bits(bits: np.ndarray, width: int, signed: bool = True) -> np.ndarray:
+    bits = bits & np.uint64(width_mask(width)[0])
+    if not signed:
+        return bits.astype(value_dtype(width, signed))
+    if width == max_width:
+        return bits.view(np.int64)
+    sign = width_mask(width)[1]
+    value = (bits ^ np.uint64(sign)).astype(np.int64) - sign
+    return value.astype(value_dtype(width, signed))
+
+
+# values wrapped into the signed range of the width
+def wrap_signed(col, width: int) -> np.ndarray:
+    return from_bits(to_bits(col, width), width).astype(np.int64)
+
+
+# integer columns as space separated hex lines, in one shot
+def encode_lines(columns, widths: list) -> bytes:
+    fields = list()
+    for col, width in zip(columns, widths):
+        n_nib = n_nibble(width)
+        bits = to_bits(col, width)
+        shifts = np.arange(n_nib - 1, -1, -1, dtype=np.uint64) * np.uint64(4)
+        fields.append(digits[(bits[:, None] >> shifts) & np.uint64(0xF)])
+        fields.append(np.full((len(bits), 1), ord(" "), dtype=np.uint8))
+    if len(fields) == 0:
+        return b""
+    fields[-1][:] = ord("\n")
+    return np.hstack(fields).tobytes()
+
+
+# hex text in blocks of rows, so long texts never exist as a whole
+def encode_chunks(columns, widths: list, n_row: int):
+    for i in range(0, len(columns[0]), n_row):
+        yield encode_lines(tuple(c_[i : i + n_row] for c_ in columns), widths).decode()
+
+
+# space separated hex text into one row of values per line,
+# header lines starting with "#" are skipped
+def decode_lines(data: bytes, width: int, signed: bool = True) -> np.ndarray:
+    while data.startswith(b"#"):
+        data = data[data.find(b"\n") + 1 :] if b"\n" in data else b""
+    if data != b"" and not data.endswith(b"\n"):
+        data += b"\n"
+    buf = np.frombuffer(data, dtype=np.uint8)
+    eol = np.flatnonzero(buf == ord("\n"))
+    bits = None
+    if len(eol) > 0 and np.all(eol == np.arange(1, len(eol) + 1) * (eol[0] + 1) - 1):
+        # fast path: all lines have the same layout, decode nibbles column-wise
+        rows = buf.reshape(len(eol), eol[0] + 1)[:, :-1]
+        nib = np.take(hex_lut, rows)
+        is_hex = nib[0] != 0xFF
+        if np.all((nib != 0xFF) == is_hex) and np.all(
+            np.take(ws_lut, rows[:, ~is_hex])
+        ):
+            edges = np.flatnonzero(np.diff(np.concatenate(([0], is_hex, [0]))))
+            bits = list()
+            for lo, hi in zip(edges[0::2], edges[1::2]):
+                v = np.zeros(len(eol), dtype=np.uint64)
+                # leading digits beyond the lane are masked off anyway
+                for k in range(max(lo, hi - max_width // 4), hi):
+                    v = (v << np.uint64(4)) | nib[:, k]
+                bits.append(v)
+            bits = np.stack(bits, axis=1)
+    if bits is None:
+        # generic path for irregular spacing
+        mask = width_mask(width)[0]
+        lines = [l.split() for l in data.decode().splitlines() if l.strip() != ""]
+        bits = np.array([[int(v, 16) & mask for v in l] for l in lines], np.uint64)
+        bits = bits.reshape(len(lines), -1) if len(lines) > 0 else bits.reshape(0, 0)
+    return from_bits(bits, width, signed)
@@ -0,0 +1,93 @@
+import os
+import re
+import time
+import signal
+import subprocess
+
+kw_list = ["error", "fatal_error"]
+fatal_kw = "fatal_error"
+# one pass for all keywords, "error" does not match inside "fatal_error"
+kw_re = re.compile(r"\b(?:{})\b".format("|".join(kw_list)), flags=re.IGNORECASE)
+poll_interval = 0.2  # seconds
+
+
+# incremental keyword counter of a log file, which may still be growing
+class log_scanner:
+    def __init__(self, filename: str, max_err: int = None) -> None:
+        self.filename = filename
+        self.max_err = max_err  # abort threshold, fatal errors always abort
+        self.cnt_err = 0
+        self.is_fatal = False
+        self.pos = 0
+        self.tail = b""  # last line until it is complete
+
+    def scan_text(self, text: str) -> None:
+        for m_ in kw_re.finditer(text):
+            self.cnt_err += 1
+            self.is_fatal = self.is_fatal or m_.group().lower() == fatal_kw
+
+    # scan the complete lines appended since the last call
+    def scan(self) -> int:
+        if not os.path.exists(self.filename):
+            return self.cnt_err
+        with open(self.filename, "rb") as f:
+            f.seek(self.pos)
+            data = self.tail + f.read()
+            self.pos = f.tell()
+        eol = data.rfind(b"\n") + 1
+        self.scan_text(data[:eol].decode(errors="replace"))
+        self.tail = data[eol:]
+        return self.cnt_err
+
+    # scan up to the end, including an unterminated last line
+    def finish(self) -> int:
+        self.scan()
+        self.scan_text(self.tail.decode(errors="replace"))
+        self.tail = b""
+        return self.cnt_err
+
+    def is_abort(self) -> bool:
+        if self.is_fatal:
+            return True
+        return self.max_err is not None and self.cnt_err >= self.max_err
+
+
+def kill_tree(proc) -> None:
+    try:
+        if os.name == "nt":
+            subprocess.call(
+                "taskkill /F /T /PID {}".format(proc.pid),
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+            )
+        else:
+            os.killpg(proc.pid, signal.SIGKILL)  # the shell and the tool under it
+    except OSError:
+        pass  # exited meanwhile
+
+
+# run a tool while tailing its log, kill it once the log shows enough errors;
+# returns the scanner with the final counts
+def run_watched(cmd: str, cwd: str, log_file: str, max_err: int = None):
+    scanner = log_scanner(log_file, max_err)
+    proc = subprocess.Popen(cmd, shell=True, cwd=cwd, start_new_session=os.name != "nt")
+    while True:
+        try:
+            proc.wait(timeout=poll_interval)
+            break
+        except subprocess.TimeoutExpired:
+            pass
+        scanner.scan()
+        if scanner.is_abort():
+            kill_tree(proc)
+            print(
+                "Killed {} after {} errors{}".format(
+                    os.path.basename(cmd.split()[0]),
+                    scanner.cnt_err,
+                    " (fatal)" if scanner.is_fatal else "",
+                )
+            )
+            break
+    proc.wait()
+    scanner.finish()
+    return scanner
@@ -1,6 +1,9 @@
+import sys
 import argparse
-import vivado_tools as vt
-import module_utils as mu
+
+# the toolchain is imported per operation, so that small operations and the
+# spawned workers, which import this module again, start fast; options that
+# default to a setting of the toolchain default to None and are resolved there
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="VHDL toolchain main entry")
@@ -11,27 +14,148 @@ if __name__ == "__main__":
         dest="mode",
         type=str,
         default="win_local",
-        choices=["win_local", "linux_local", "linux_ci"],
+        choices=["win_local", "linux_local", "linux_ci", "path", "fake"],
         help="running mode",
     )
+    parser.add_argument(
+        "-j",
+        dest="n_jobs",
+        type=int,
+        default=1,
+        help="number of parallel sim cases or regression jobs",
+    )
+    parser.add_argument(
+        "-k",
+        dest="max_err",
+        type=int,
+        default=None,
+        help="stop checking a case after K mismatches",
+    )
+    parser.add_argument(
+        "--kill-errors",
+        dest="kill_errors",
+        type=int,
+        default=None,
+        help="kill the simulator once its log shows N errors",
+    )
+    parser.add_argument(
+        "--sim-worker",
+        dest="use_worker",
+        action="store_true",
+        help="run the cases in persistent simulator sessions",
+    )
+    parser.add_argument(
+        "--rebuild",
+        action="store_true",
+        help="ignore the build cache and compile everything",
+    )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="sim: pipe patterns through the simulator instead of files",
+    )
+    parser.add_argument(
+        "--changed-only",
+        dest="changed_only",
+        action="store_true",
+        help="sim: skip cases whose inputs are unchanged since their last pass",
+    )
+    parser.add_argument(
+        "--cache-size",
+        dest="cache_size",
+        type=float,
+        default=None,
+        help="size limit of the pattern cache in MB",
+    )
+    parser.add_argument(
+        "--prune",
+        action="store_true",
+        help="cache: evict least recently used patterns down to the size limit",
+    )
+    parser.add_argument(
+        "--keep",
+        type=int,
+        default=None,
+        help="number of runs kept in the work area, 0 keeps all",
+    )
+    parser.add_argument(
+        "--budget",
+        type=float,
+        default=None,
+        help="disk budget of the runs in the work area in MB, 0 for none",
+    )
     args = parser.parse_args()
+    if args.op_type in ["lint", "sim", "view", "cache", "runs"]:
+        import vivado_tools as vt
+
+        cfg = vt.load_module_config()
     if args.op_type == "init":
+        import module_utils as mu
+
         mu.module_init()
     elif args.op_type == "lint":
-        cfg = vt.parse_module_config()
-        vt.create_vivado_dir(cfg, vivado_mode=args.mode)
-        vt.module_compile(cfg, w_tb=False)
+        vt.create_vivado_dir(
+            cfg, vivado_mode=args.mode, op="lint", keep=args.keep, budget=args.budget
+        )
+        with vt.run_guard(cfg):
+            vt.module_compile(cfg, w_tb=False, rebuild=args.rebuild)
+            vt.report_perf(cfg)
+            vt.record_run(cfg, "pass")
     elif args.op_type == "sim":
-        cfg = vt.parse_module_config()
-        vt.create_vivado_dir(cfg, vivado_mode=args.mode)
-        vt.module_compile(cfg, w_tb=True)
-        vt.module_elaborate(cfg)
-        vt.module_simulate(cfg)
+        vt.create_vivado_dir(
+            cfg, vivado_mode=args.mode, keep=args.keep, budget=args.budget
+        )
+        with vt.run_guard(cfg):
+            vt.module_compile(cfg, w_tb=True, rebuild=args.rebuild)
+            vt.module_elaborate(cfg, rebuild=args.rebuild)
+            vt.module_simulate(
+                cfg,
+                n_jobs=args.n_jobs,
+                max_err=args.max_err,
+                cache_size=args.cache_size,
+                stream=args.stream,
+                kill_errors=args.kill_errors,
+                use_worker=args.use_worker,
+                changed_only=args.changed_only,
+            )
     elif args.op_type == "view":
-        cfg = vt.parse_module_config()
         vt.create_vivado_dir(cfg, vivado_mode=args.mode, gen_work_dir=False)
         assert args.sim_dir is not None
         vt.view_latest_result(cfg, args.sim_dir)
+    elif args.op_type == "cache":
+        import pat_cache
+
+        if args.cache_size is None:
+            args.cache_size = pat_cache.default_max_size
+        if args.prune:
+            evicted = pat_cache.evict(vt.pat_cache_dir(cfg), args.cache_size)
+            print("Evicted {} entries".format(len(evicted)))
+        pat_cache.show_cache(vt.pat_cache_dir(cfg), args.cache_size)
+    elif args.op_type == "runs":
+        import run_index
+
+        build_dir = vt.module_build_dir(cfg)
+        if args.keep is not None or args.budget is not None:
+            removed = run_index.cleanup(
+                build_dir,
+                run_index.default_keep if args.keep is None else args.keep,
+                0 if args.budget is None else args.budget,
+            )
+            print("Removed {} runs".format(len(removed)))
+        run_index.show_runs(build_dir)
+    elif args.op_type == "regress":
+        import regress
+
+        n_fail = regress.run_regression(
+            vivado_mode=args.mode,
+            n_jobs=args.n_jobs,
+            max_err=args.max_err,
+            stream=args.stream,
+            kill_errors=args.kill_errors,
+            use_worker=args.use_worker,
+        )
+        if n_fail > 0:
+            sys.exit("Regression failed: {} tasks".format(n_fail))
     else:
         print("Unknown operation type")
         parser.print_help()
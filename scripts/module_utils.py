@@ -84,6 +84,13 @@ def create_empty_vhdl(dir_name, module_name, libs, ports):
         f.close()
 
 
+# log_wave commands of a waveform scope: an hdl path or a list of them, each
+# logged recursively, an empty list logs no waveforms
+def wave_tcl(wave_scope) -> list:
+    scopes = [wave_scope] if isinstance(wave_scope, str) else list(wave_scope or [])
+    return ["log_wave -r -v {}\n".format(_s) for _s in scopes]
+
+
 def create_sim_tcl(dir_name: str, sim_timeout: str) -> None:
     assert os.path.exists(dir_name)
     file_name = os.path.join(dir_name, sim_tcl_name)
@@ -94,3 +101,21 @@ def create_sim_tcl(dir_name: str, sim_timeout: str) -> None:
         f.write("run {}\n".format(sim_timeout))
         f.write("quit\n")
         f.close()
+
+
+# replace the log_wave commands of a tcl file by those of a waveform scope; the
+# file is written anew, as it may be a link to a shared or a cached one
+def set_wave_scope(tcl_file: str, wave_scope) -> None:
+    with open(tcl_file) as f:
+        lines = f.readlines()
+    cmds = wave_tcl(wave_scope)
+    tcl = list()
+    for line in lines:
+        if line.split()[:1] == ["log_wave"]:
+            tcl += cmds
+            cmds = list()
+        else:
+            tcl.append(line)
+    os.remove(tcl_file)
+    with open(tcl_file, "w") as f:
+        f.writelines(cmds + tcl)  # first thing of a tcl file without log_wave
@@ -1,12 +1,38 @@
 import os
 import re
+import sys
+import stat
 import shutil
 import ctypes
+import contextlib
+import importlib.util
 from datetime import datetime
 
+try:
+    import fcntl
+except ImportError:
+    fcntl = None  # no advisory locks on windows
+
 # file copy
 copyfile = shutil.copyfile
 
+
+# exclusive lock across processes while the block runs, on a lock file that
+# is created if needed; without fcntl the block runs unlocked
+@contextlib.contextmanager
+def file_lock(lock_file):
+    if fcntl is None:
+        yield
+        return
+    os.makedirs(os.path.dirname(lock_file), exist_ok=True)
+    with open(lock_file, "a") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
 # create symbolic link
 def symlink(src, dst):
     os_symlink = getattr(os, "symlink", None)
@@ -55,6 +81,18 @@ def get_latest_dir(dir_base, dir_name):
     return os.path.join(dir_base, tmp)
 
 
+# bytes taken by the files under a directory, symbolic links and hard links
+# are not counted as their space is shared with another place
+def dir_size(dir_path):
+    size = 0
+    for root, _, files in os.walk(dir_path):
+        for _f in files:
+            st = os.lstat(os.path.join(root, _f))
+            if stat.S_ISREG(st.st_mode) and st.st_nlink == 1:
+                size += st.st_size
+    return size
+
+
 # count a keyword from a file
 def count_keyword(filename, keyword):
     assert os.path.exists(filename)
@@ -64,3 +102,17 @@ def count_keyword(filename, keyword):
         _d = f.read()
         cnt_err = sum(1 for match in re.finditer(re_pat, _d, flags=re.IGNORECASE))
     return cnt_err
+
+
+# module that is only loaded on its first attribute access, for heavy imports
+# such as numpy that most operations never need
+def lazy_import(name):
+    if name in sys.modules:
+        return sys.modules[name]
+    spec = importlib.util.find_spec(name)
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    return module
@@ -0,0 +1,112 @@
+import os
+import json
+import time
+import shutil
+import hashlib
+import os_utils
+
+cache_dir_name = "pat_cache"
+meta_name = "meta.json"
+default_max_size = 2048  # MB
+
+
+# key of a generated case: its config plus the sources that turn it into patterns
+def cache_key(pat_cfg: dict, src_files: list) -> str:
+    h = hashlib.sha256()
+    h.update(json.dumps(pat_cfg, sort_keys=True, default=str).encode())
+    for _f in src_files:
+        with open(_f, "rb") as f:
+            h.update(f.read())
+    return h.hexdigest()
+
+
+def entry_size(entry_dir: str) -> int:
+    return sum(
+        os.path.getsize(os.path.join(entry_dir, _f)) for _f in os.listdir(entry_dir)
+    )
+
+
+# hard link where possible, the cached files are never modified in place
+def link_file(src: str, dst: str) -> None:
+    try:
+        os.link(src, dst)
+    except OSError:
+        os_utils.symlink(src, dst)
+
+
+def fetch(cache_dir: str, key: str, case_dir: str) -> bool:
+    entry_dir = os.path.join(cache_dir, key)
+    if not os.path.exists(os.path.join(entry_dir, meta_name)):
+        return False
+    for _f in os.listdir(entry_dir):
+        if _f != meta_name:
+            link_file(os.path.join(entry_dir, _f), os.path.join(case_dir, _f))
+    os.utime(os.path.join(entry_dir, meta_name))  # mark as recently used
+    return True
+
+
+def store(cache_dir: str, key: str, case_dir: str, sim_case: str) -> None:
+    entry_dir = os.path.join(cache_dir, key)
+    if os.path.exists(entry_dir):
+        return
+    tmp_dir = os_utils.mkdir(cache_dir, "{}.{}.tmp".format(key, os.getpid()))
+    for _f in os.listdir(case_dir):
+        link_file(os.path.join(case_dir, _f), os.path.join(tmp_dir, _f))
+    # the meta file is written last and marks a complete entry
+    with open(os.path.join(tmp_dir, meta_name), "w") as f:
+        json.dump({"case": sim_case, "created": time.time()}, f)
+    try:
+        os.rename(tmp_dir, entry_dir)
+    except OSError:
+        shutil.rmtree(tmp_dir, ignore_errors=True)  # stored by a parallel job already
+
+
+# cache entries as (key, case, size, last used), most recently used first
+def list_entries(cache_dir: str) -> list:
+    entries = list()
+    if not os.path.exists(cache_dir):
+        return entries
+    for key in os.listdir(cache_dir):
+        meta_file = os.path.join(cache_dir, key, meta_name)
+        if not os.path.exists(meta_file):
+            continue  # incomplete entry
+        with open(meta_file) as f:
+            sim_case = json.load(f)["case"]
+        entry_dir = os.path.join(cache_dir, key)
+        entries.append(
+            (key, sim_case, entry_size(entry_dir), os.path.getmtime(meta_file))
+        )
+    return sorted(entries, key=lambda e_: e_[3], reverse=True)
+
+
+# least recently used eviction down to max_size MB
+def evict(cache_dir: str, max_size: float = default_max_size) -> list:
+    evicted = list()
+    entries = list_entries(cache_dir)
+    total = sum(e_[2] for e_ in entries)
+    while len(entries) > 0 and total > max_size * (1 << 20):
+        key, _, size, _ = entries.pop()
+        shutil.rmtree(os.path.join(cache_dir, key), ignore_errors=True)
+        total -= size
+        evicted.append(key)
+    return evicted
+
+
+def show_cache(cache_dir: str, max_size: float = default_max_size) -> None:
+    entries = list_entries(cache_dir)
+    total = sum(e_[2] for e_ in entries)
+    print("Pattern cache: {}".format(cache_dir))
+    for key, sim_case, size, last_used in entries:
+        print(
+            "  {}  {:>10.2f} MB  {}  {}".format(
+                key[:12],
+                size / (1 << 20),
+                time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(last_used)),
+                sim_case,
+            )
+        )
+    print(
+        "{} entries, {:.2f} MB of {:.2f} MB".format(
+            len(entries), total / (1 << 20), max_size
+        )
+    )
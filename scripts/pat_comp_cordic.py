@@ -1,21 +1,140 @@
+import os
+import numpy as np
 import verif_utils
+import comp_service
+import hex_codec
+import pat_stats
+import cordic_model
 
 w_data = 16
 thr_err = 8
+# "bulk": whole files as numpy arrays, "line": streaming line by line, both with
+# tolerance against the golden file; "exact": bit-exact against cordic_model
+comp_mode = "bulk"
+field_names = ["x", "y", "theta"]
+# error statistics and stimulus coverage report of all pairs, passing ones too,
+# off by default as it loads both files once more in the line mode and bins the
+# stimulus; sim: comp_stats in config.yml overrides it
+with_stats = False
+n_octant = 8
+n_shift = w_data - 2  # shifts of the leading zero/one shifter, 0 to w_data - 3
 
 
 class pattern_comparator(verif_utils.pattern_comparator):
+    deps = [cordic_model, hex_codec]  # the exact mode model and the pattern decoding
+
+    @classmethod
+    def reads_arrays(cls, mode) -> bool:
+        return (comp_mode if mode is None else mode) in ["bulk", "exact"]
+
+    def diff_line(self, golden: str, dump: str, line_id: int) -> int:
+        return line_comp_cordic(golden, dump, line_id)
+
     def run(self) -> int:
         cnt_err = 0
+        max_print = 20 if self.max_err is None else self.max_err
+        mode = comp_mode if self.comp_mode is None else self.comp_mode
+        stats = with_stats if self.with_stats is None else self.with_stats
         for p_, d_ in self.pattern_list:
-            cnt_err += verif_utils.check_pat_diff(p_, d_, f_diff=line_comp_cordic)
+            values = None
+            is_streamed = not os.path.isfile(d_)  # a pipe is read only once
+            if mode == "exact":
+                values = exact_pair(p_, d_)
+                pair_err = verif_utils.check_pat_tolerance(
+                    p_,
+                    d_,
+                    w_data,
+                    0,
+                    field_names=field_names,
+                    max_print=max_print,
+                    values=values,
+                    max_err=self.max_err,
+                )
+            elif mode == "bulk":
+                values = verif_utils.load_pat_pair(p_, d_, w_data)
+                pair_err = verif_utils.check_pat_tolerance(
+                    p_,
+                    d_,
+                    w_data,
+                    thr_err,
+                    field_names=field_names,
+                    max_print=max_print,
+                    values=values,
+                    max_err=self.max_err,
+                )
+            else:
+                pair_err = comp_service.check_pairs(
+                    [(p_, d_)],
+                    f_diff=line_comp_cordic,
+                    max_err=self.max_err,
+                    max_print=max_print,
+                    n_jobs=self.n_jobs,
+                )[0]
+            cnt_err += pair_err
+            if stats and not is_streamed:
+                analyze_pair(
+                    p_, d_, values, max_print, 0 if mode == "exact" else thr_err
+                )
         return cnt_err
 
 
+# expected outputs from the bit-exact model of the stimulus in pat_in.txt next to
+# the golden patterns; if that was streamed through a pipe, the golden file is
+# taken as it is, which then has to be generated with golden: exact
+def exact_pair(golden: str, dump: str) -> tuple:
+    val_g, val_d = verif_utils.load_pat_pair(golden, dump, w_data)
+    pat_in = os.path.join(os.path.dirname(golden), "pat_in.txt")
+    if os.path.isfile(pat_in):
+        val_in = verif_utils.load_pat_array(pat_in, w_data)
+        val_g = np.stack(cordic_model.cordic_top(*val_in[:, :4].T), axis=1)
+    return val_g, val_d
+
+
+# input angle octant and lzsh shift of each pattern: the angle of the input
+# vector in vector mode, the rotation angle in rotate mode
+def stimulus_bins(val_in: np.ndarray) -> dict:
+    mode, x, y, theta = (val_in[:, c_].astype(np.int64) for c_ in range(4))
+    is_vec = mode == 1
+    vec_angle = np.rint(np.arctan2(y, x) * (1 << w_data) / (2 * np.pi))
+    angle = np.where(is_vec, vec_angle.astype(np.int64), theta) & ((1 << w_data) - 1)
+    shift = cordic_model.lzsh(mode, x, y, w_data)[2]
+    return {
+        "theta_octant": (angle >> (w_data - 3), n_octant),
+        "lzsh": (np.minimum(shift, n_shift - 1), n_shift),
+    }
+
+
+# error statistics of a compared pair, binned by the stimulus in pat_in.txt next
+# to the golden patterns; skipped for files that were streamed through pipes
+def analyze_pair(
+    golden: str, dump: str, values=None, max_print: int = 20, thr: int = thr_err
+) -> None:
+    if values is None:
+        if not (os.path.isfile(dump) or os.path.isfile(verif_utils.npy_name(dump))):
+            return
+        values = verif_utils.load_pat_pair(golden, dump, w_data)
+    bins = None
+    pat_in = os.path.join(os.path.dirname(golden), "pat_in.txt")
+    if os.path.isfile(pat_in):
+        bins = stimulus_bins(verif_utils.load_pat_array(pat_in, w_data))
+        if len(bins["lzsh"][0]) != len(values[0]):
+            bins = None  # not the stimulus of these patterns
+    pat_stats.analyze(
+        dump,
+        values[0],
+        values[1],
+        w_data,
+        thr,
+        field_names,
+        bins=bins,
+        cov={"theta_octant x lzsh": ("theta_octant", "lzsh")} if bins else None,
+        max_print=max_print,
+    )
+
+
 def line_comp_cordic(golden: str, dump: str, line_id: int) -> int:
-    line_decode = lambda x: [
-        verif_utils.signed_hex2int(v, w_data) for v in x.split(" ")
-    ]
+    decode = hex_codec.decoder(w_data)
+    line_decode = lambda x: [decode(v) for v in x.split(" ")]
     err_msg = ""
     for v, g, d in zip(["x", "y", "theta"], line_decode(golden), line_decode(dump)):
         if abs(g - d) > thr_err:
@@ -23,7 +142,7 @@ def line_comp_cordic(golden: str, dump: str, line_id: int) -> int:
             if abs(abs(g - d) - (1 << w_data)) < thr_err:
                 continue  # not counted as error
             err_msg += "\n  {}: expected({}) differ from result({}) too much!".format(
-                v, verif_utils.int2hex(g, w_data), verif_utils.int2hex(d, w_data)
+                v, hex_codec.int2hex(g, w_data), hex_codec.int2hex(d, w_data)
             )
     if err_msg != "":
         print(
@@ -1,91 +1,60 @@
 import numpy as np
-import verif_utils
+import pat_gen_utils
+import cordic_model
 
 w_data = 16
 
 
-class pattern_generator(verif_utils.pattern_generator):
-    def run(self):
-        # generate variable arrays
-        var_dict = dict()
-        for k in ["ampl", "theta_init"]:
-            if k in self.pat_cfg:
-                if self.pat_cfg[k]["mode"] == "random":
-                    seed = 0
-                    if "seed" in self.pat_cfg[k]:
-                        seed = self.pat_cfg[k]["seed"]
-                    np.random.seed(seed)
-                    v = np.random.randint(
-                        self.pat_cfg[k]["range"][0],
-                        self.pat_cfg[k]["range"][1],
-                        self.pat_cfg["n_pat"],
-                    ).astype(int)
-                else:
-                    v = np.ones(self.pat_cfg["n_pat"]).astype(int) * int(
-                        self.pat_cfg[k]["value"]
-                    )
-            else:
-                v = np.zeros(self.pat_cfg["n_pat"]).astype(int)
-            var_dict[k] = v
-        var_dict["theta"] = np.linspace(
-            0, ((1 << w_data) - 1), num=self.pat_cfg["n_pat"], dtype=int
-        )
-        with open("pat_in.txt", "w") as f_in, open("pat_out.txt", "w") as f_out:
-            f_in.write("# mode, x, y, theta\n")
-            for i in range(self.pat_cfg["n_pat"]):
-                mode = 1 if self.pat_cfg["cordic_mode"] == "vector" else 0
-                phase_i = (
-                    var_dict["theta"][i] if mode == 1 else var_dict["theta_init"][i]
-                )
-                phase_o = (
-                    0
-                    if mode == 1
-                    else (
-                        (var_dict["theta"][i] + var_dict["theta_init"][i])
-                        & ((1 << w_data) - 1)
-                    )
-                )
-                x_i = int(
-                    float(var_dict["ampl"][i])
-                    * np.cos(2 * np.pi * float(phase_i) / (2 ** w_data))
-                )
-                y_i = int(
-                    float(var_dict["ampl"][i])
-                    * np.sin(2 * np.pi * float(phase_i) / (2 ** w_data))
-                )
-                theta_i = 0 if mode == 1 else var_dict["theta"][i]
-                theta_o = var_dict["theta"][i] if mode == 1 else 0
-                f_in.write(
-                    "{} {} {} {}\n".format(
-                        mode,
-                        verif_utils.int2hex(x_i, w_data),
-                        verif_utils.int2hex(y_i, w_data),
-                        verif_utils.int2hex(theta_i, w_data),
-                    )
-                )
-                # to simulate the leading zero/one shifter in RTL codes
-                lsh = 0
-                if mode == 1:
-                    op_hi = int(1 << (w_data - 3)) - 1
-                    op_lo = -int(1 << (w_data - 3))
-                    while (op_lo <= x_i <= op_hi) and (op_lo <= y_i <= op_hi):
-                        x_i *= 2
-                        y_i *= 2
-                        lsh += 1
-                x_o = int(
-                    float(var_dict["ampl"][i] << lsh)
-                    * np.cos(2 * np.pi * float(phase_o) / (2 ** w_data))
-                )
-                y_o = int(
-                    float(var_dict["ampl"][i] << lsh)
-                    * np.sin(2 * np.pi * float(phase_o) / (2 ** w_data))
-                )
-                f_out.write(
-                    "{} {} {}\n".format(
-                        verif_utils.int2hex(x_o, w_data),
-                        verif_utils.int2hex(y_o, w_data),
-                        verif_utils.int2hex(theta_o, w_data),
-                    )
-                )
-            f_in.close()
-            f_out.close()
+class pattern_generator(pat_gen_utils.pattern_generator):
+    fields = {
+        "ampl": {"mode": "fixed", "value": 0},
+        "theta_init": {"mode": "fixed", "value": 0},
+        "theta": {"mode": "linspace", "range": [0, (1 << w_data) - 1]},
+    }
+    in_widths = [1, w_data, w_data, w_data]
+    out_widths = [w_data, w_data, w_data]
+    deps = [cordic_model]
+
+    def in_header(self) -> str:
+        return "# mode, x, y, theta\n"
+
+    def gen_patterns(self, var_dict: dict) -> tuple:
+        n_pat = len(var_dict["theta"])
+        mode = 1 if self.pat_cfg["cordic_mode"] == "vector" else 0
+        if mode == 1:
+            phase_i = var_dict["theta"]
+            phase_o = np.zeros(n_pat, dtype=int)
+            theta_i = np.zeros(n_pat, dtype=int)
+            theta_o = var_dict["theta"]
+        else:
+            phase_i = var_dict["theta_init"]
+            phase_o = (var_dict["theta"] + var_dict["theta_init"]) & ((1 << w_data) - 1)
+            theta_i = var_dict["theta"]
+            theta_o = np.zeros(n_pat, dtype=int)
+        x_i, y_i = polar2rect(var_dict["ampl"], phase_i)
+        # to simulate the leading zero/one shifter in RTL codes
+        lsh = lzsh_count(x_i, y_i) if mode == 1 else np.zeros(n_pat, dtype=int)
+        x_o, y_o = polar2rect(var_dict["ampl"] << lsh, phase_o)
+        pat_in = (np.full(n_pat, mode), x_i, y_i, theta_i)
+        pat_out = (x_o, y_o, theta_o)
+        # "ideal": exact trigonometry, "exact": bit-exact model of the RTL
+        if self.pat_cfg.get("golden", "ideal") == "exact":
+            pat_out = cordic_model.cordic_top(*pat_in)
+        return pat_in, pat_out
+
+
+# same truncation as int(float(ampl) * np.cos(...)) on each element
+def polar2rect(ampl: np.ndarray, phase: np.ndarray) -> tuple:
+    rad = 2 * np.pi * phase.astype(float) / (2**w_data)
+    ampl_f = ampl.astype(float)
+    x = np.trunc(ampl_f * np.cos(rad)).astype(int)
+    y = np.trunc(ampl_f * np.sin(rad)).astype(int)
+    return x, y
+
+
+# number of left shifts until x or y leaves [-2^(w-3), 2^(w-3)-1]
+def lzsh_count(x: np.ndarray, y: np.ndarray) -> np.ndarray:
+    # bit length of the magnitude, counting -2^k as k bits like the sign bit does
+    bit_len = lambda v: np.frexp(np.where(v < 0, ~v, v).astype(float))[1]
+    n_sh = (w_data - 2) - np.maximum(bit_len(x), bit_len(y))
+    return np.maximum(n_sh, 0)
@@ -0,0 +1,51 @@
+import numpy as np
+import pat_gen_utils
+
+# widths of tb_pkg in i2c_master
+w_addr = 7
+w_buf = 3
+n_buf = 7
+w_buf_data = n_buf * 8
+w_ckdiv = 16
+
+
+class pattern_generator(pat_gen_utils.pattern_generator):
+    fields = {
+        "addr": {"mode": "random", "range": [0, 1 << w_addr]},
+        "wr_bytes": {"mode": "random", "range": [1, n_buf + 1]},
+        "wr_data": {"mode": "random", "range": [0, 1 << w_buf_data]},
+        "rd_bytes": {"mode": "random", "range": [1, n_buf + 1]},
+        "rd_data": {"mode": "random", "range": [0, 1 << w_buf_data]},
+    }
+    in_widths = [w_addr, w_buf, w_buf_data, w_buf, w_buf_data]
+    out_widths = [w_addr, w_buf_data, w_buf_data]
+
+    # ckdiv is set once per case
+    def in_header(self) -> str:
+        return (
+            "#### configuration ####\n# ckdiv\n{:04x}\n#### data ####\n"
+            "# addr, wr_bytes, wr_data, rd_bytes, rd_data\n".format(
+                int(self.pat_cfg.get("ckdiv", 0x32))
+            )
+        )
+
+    def gen_patterns(self, var_dict: dict) -> tuple:
+        n_wr = var_dict["wr_bytes"]
+        n_rd = var_dict["rd_bytes"]
+        assert np.all((n_wr >= 0) & (n_wr <= n_buf)), "Error: wr_bytes out of range"
+        assert np.all((n_rd >= 0) & (n_rd <= n_buf)), "Error: rd_bytes out of range"
+        # only the lower bytes of the buffers are transferred
+        byte_mask = lambda n_: np.left_shift(np.int64(1), 8 * n_) - 1
+        pat_in = (
+            var_dict["addr"],
+            n_wr,
+            var_dict["wr_data"],
+            n_rd,
+            var_dict["rd_data"],
+        )
+        pat_out = (
+            var_dict["addr"],
+            var_dict["wr_data"] & byte_mask(n_wr),
+            var_dict["rd_data"] & byte_mask(n_rd),
+        )
+        return pat_in, pat_out
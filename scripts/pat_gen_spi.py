@@ -0,0 +1,38 @@
+import numpy as np
+import pat_gen_utils
+
+# widths of tb_pkg in spi_master
+w_cnt = 6
+w_data = 48
+w_ckdiv = 16
+
+
+class pattern_generator(pat_gen_utils.pattern_generator):
+    fields = {
+        "ckdiv": {"mode": "fixed", "value": 4},
+        "nbits": {"mode": "fixed", "value": w_data},
+        "data": {"mode": "random", "range": [0, 1 << w_data]},
+        "write": {"mode": "random", "values": [0, 1]},
+    }
+    in_widths = [w_ckdiv, w_cnt, w_data, 1]
+    out_widths = [w_data, 1]
+
+    # cpol and cpha are set once per case
+    def in_header(self) -> str:
+        return (
+            "# configuration:\n# cpol cpha\n{} {}\n"
+            "# ckdiv nbits data_block write(1)/read(0)\n".format(
+                self.pat_cfg.get("cpol", 0), self.pat_cfg.get("cpha", 0)
+            )
+        )
+
+    def gen_patterns(self, var_dict: dict) -> tuple:
+        nbits = var_dict["nbits"]
+        assert np.all((nbits > 0) & (nbits <= w_data)), "Error: nbits out of range"
+        assert np.all(var_dict["ckdiv"] > 0), "Error: ckdiv must be positive"
+        data = var_dict["data"] & ((1 << w_data) - 1)
+        # the first nbits of the data block are sent msb first, both ways, and
+        # the testbench dumps them right aligned
+        pat_in = (var_dict["ckdiv"], nbits, data, var_dict["write"])
+        pat_out = (data >> (w_data - nbits), var_dict["write"])
+        return pat_in, pat_out
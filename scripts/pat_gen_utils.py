@@ -0,0 +1,185 @@
+import os
+import itertools
+import functools
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import verif_utils
+import hex_codec
+
+n_chunk = 1 << 16  # patterns per chunk, also the grid of the random streams
+field_modes = ["fixed", "random", "sweep", "linspace"]
+rng_modes = ["legacy", "stream"]  # case key rng: random streams of the generators
+
+
+# field specs of generated cases, the value of pattern i of n_pat is given by
+#   {mode: fixed, value: v}
+#   {mode: random, range: [a, b], seed: s}   uniform in a..b-1, seed optional
+#   {mode: random, values: [...], seed: s}   uniform choice of the values
+#   {mode: sweep, values: [...]}             values[i % len(values)]
+#   {mode: sweep, range: [a, b], step: s}    same over a, a+s, ... up to b
+#   {mode: linspace, range: [a, b]}          n_pat points from a to b, floored
+# a plain number is taken as a fixed value
+def parse_spec(name: str, spec) -> dict:
+    if not isinstance(spec, dict):
+        spec = {"mode": "fixed", "value": spec}
+    msg = "Error: invalid spec of field {}".format(name)
+    assert spec.get("mode") in field_modes, msg
+    if spec["mode"] == "fixed":
+        assert "value" in spec, msg
+    elif spec["mode"] == "linspace" or "values" not in spec:
+        assert len(spec.get("range", [])) == 2, msg
+    return spec
+
+
+def spec_values(spec: dict) -> np.ndarray:
+    if "values" in spec:
+        return np.array([int(v_) for v_ in spec["values"]], dtype=np.int64)
+    lo, hi = (int(v_) for v_ in spec["range"])
+    return np.arange(lo, hi + 1, int(spec.get("step", 1)), dtype=np.int64)
+
+
+# the random values of the first generators, np.random.seed(seed) and one draw
+# of all n_pat values, which a chunk or shard slices; rng: legacy (the default)
+# keeps it so that existing cases keep their patterns, cached for the chunks
+@functools.lru_cache(maxsize=8)
+def legacy_random(seed: int, n_pat: int, bounds: tuple, values: tuple) -> np.ndarray:
+    np.random.seed(seed)
+    if values is not None:
+        v = np.random.choice(np.array(values, dtype=np.int64), n_pat)
+    else:
+        v = np.random.randint(bounds[0], bounds[1], n_pat).astype(int)
+    v.flags.writeable = False
+    return v
+
+
+# with rng: stream, an independent stream of a field in a chunk of patterns, the
+# seed sequence is SeedSequence(seed).spawn(...)[i_field].spawn(...)[i_chunk], so
+# the values of a chunk do not depend on which process generates it, or when
+def field_rng(seed: int, i_field: int, i_chunk: int) -> np.random.Generator:
+    return np.random.default_rng(
+        np.random.SeedSequence(seed, spawn_key=(i_field, i_chunk))
+    )
+
+
+# values of a field for the patterns lo..hi-1 of n_pat
+def gen_field(
+    spec: dict,
+    i_field: int,
+    seed: int,
+    n_pat: int,
+    lo: int,
+    hi: int,
+    rng_mode: str = "legacy",
+) -> np.ndarray:
+    if spec["mode"] == "fixed":
+        return np.full(hi - lo, int(spec["value"]), dtype=np.int64)
+    if spec["mode"] == "linspace":
+        # element-wise the same as np.linspace(a, b, n_pat, dtype=int)
+        a, b = (int(v_) for v_ in spec["range"])
+        v = np.arange(lo, hi, dtype=float) * ((b - a) / max(n_pat - 1, 1)) + a
+        if n_pat > 1 and lo < n_pat <= hi:
+            v[n_pat - 1 - lo] = b
+        return np.floor(v).astype(np.int64)
+    if spec["mode"] == "sweep":
+        values = spec_values(spec)
+        return values[np.arange(lo, hi) % len(values)]
+    seed = int(spec.get("seed", seed))
+    if rng_mode == "legacy":
+        values = tuple(spec_values(spec).tolist()) if "values" in spec else None
+        bounds = None if "values" in spec else tuple(int(v_) for v_ in spec["range"])
+        return legacy_random(seed, n_pat, bounds, values)[lo:hi]
+    v = [np.zeros(0, dtype=np.int64)]
+    for k in range(lo // n_chunk, (hi + n_chunk - 1) // n_chunk):
+        rng = field_rng(seed, i_field, k)
+        size = min(n_chunk, n_pat - k * n_chunk)
+        if "values" in spec:
+            v_k = rng.choice(spec_values(spec), size)
+        else:
+            a, b = (int(v_) for v_ in spec["range"])
+            v_k = rng.integers(a, b, size, dtype=np.int64)
+        v.append(v_k[max(lo - k * n_chunk, 0) : hi - k * n_chunk])
+    return np.concatenate(v)
+
+
+# generator of pattern files from declared fields, subclasses define the fields
+# with their default specs, the pattern format and gen_patterns as the golden model
+class pattern_generator(verif_utils.pattern_generator):
+    fields = dict()  # default spec by field name, case configs override them
+    in_widths = list()  # bit width of each column of pat_in.txt
+    out_widths = list()  # bit width of each column of pat_out.txt
+    deps = list()  # other modules the patterns depend on, for the pattern cache
+
+    # comment and configuration lines at the top of pat_in.txt
+    def in_header(self) -> str:
+        return ""
+
+    # input and expected output columns of the patterns from the field values
+    def gen_patterns(self, var_dict: dict) -> tuple:
+        raise NotImplementedError
+
+    def field_specs(self) -> dict:
+        return {
+            k: parse_spec(k, self.pat_cfg.get(k, v)) for k, v in self.fields.items()
+        }
+
+    # field values of the patterns lo..hi-1, the case seed applies to the random
+    # fields without their own seed
+    def gen_vars(self, lo: int, hi: int) -> dict:
+        n_pat = self.pat_cfg["n_pat"]
+        seed = self.pat_cfg.get("seed", 0)
+        rng_mode = self.pat_cfg.get("rng", "legacy")
+        assert rng_mode in rng_modes, "Error: unknown rng {}".format(rng_mode)
+        return {
+            k: gen_field(s_, i, seed, n_pat, lo, hi, rng_mode)
+            for i, (k, s_) in enumerate(self.field_specs().items())
+        }
+
+    # pattern ranges of the chunks in the range of this generator (or shard)
+    def chunk_ranges(self) -> list:
+        lo, hi = self.pat_range
+        edges = [lo] + list(range((lo // n_chunk + 1) * n_chunk, hi, n_chunk)) + [hi]
+        return [(a, b) for a, b in zip(edges[:-1], edges[1:]) if b > a]
+
+    # hex text of a chunk, for pat_in (side 0) and / or pat_out (side 1)
+    def gen_chunk(self, pat_range: tuple, sides: tuple = (0, 1)) -> tuple:
+        pats = self.gen_patterns(self.gen_vars(*pat_range))
+        widths = (self.in_widths, self.out_widths)
+        return tuple(
+            hex_codec.encode_lines(pats[s_], widths[s_]).decode() for s_ in sides
+        )
+
+    # chunks in order, generated by gen_jobs processes if the case sets it
+    def iter_chunks(self, sides: tuple = (0, 1)):
+        ranges = self.chunk_ranges()
+        n_jobs = min(int(self.pat_cfg.get("gen_jobs", 1)), len(ranges))
+        if n_jobs <= 1:
+            yield from (self.gen_chunk(r_, sides) for r_ in ranges)
+            return
+        with ProcessPoolExecutor(n_jobs) as pool:
+            yield from pool.map(self.gen_chunk, ranges, itertools.repeat(sides))
+
+    # call entry
+    def run(self) -> None:
+        f_in_name = os.path.join(self.work_dir, "pat_in.txt")
+        f_out_name = os.path.join(self.work_dir, "pat_out.txt")
+        # the testbench always reads the text input
+        with open(f_in_name, "w") as f_in:
+            f_in.write(self.in_header())
+            if self.pat_format == "npy":
+                pat_in, pat_out = self.gen_patterns(self.gen_vars(*self.pat_range))
+                f_in.write(hex_codec.encode_lines(pat_in, self.in_widths).decode())
+                verif_utils.save_pat_array(f_in_name, pat_in, max(self.in_widths))
+                verif_utils.save_pat_array(f_out_name, pat_out, max(self.out_widths))
+                return
+            with open(f_out_name, "w") as f_out:
+                for t_in, t_out in self.iter_chunks():
+                    f_in.write(t_in)
+                    f_out.write(t_out)
+
+    def gen_text(self) -> dict:
+        return {
+            "pat_in.txt": itertools.chain(
+                [self.in_header()], (t_[0] for t_ in self.iter_chunks((0,)))
+            ),
+            "pat_out.txt": (t_[0] for t_ in self.iter_chunks((1,))),
+        }
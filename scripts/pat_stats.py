@@ -0,0 +1,146 @@
+import os
+import json
+import numpy as np
+import hex_codec
+import verif_utils
+
+report_name = "comp_report.json"  # written next to the DUT dump
+
+
+# absolute difference of each value, wrapped into the signed range so that
+# e.g. 0x7fff against 0x8000 counts as 1
+def abs_error(val_g: np.ndarray, val_d: np.ndarray, width: int) -> np.ndarray:
+    diff = val_d.astype(np.int64) - val_g
+    return np.abs(hex_codec.wrap_signed(diff, width))
+
+
+# counts of absolute errors in power of two bins: 0, 1, 2-3, 4-7, ...
+def error_hist(err: np.ndarray) -> dict:
+    cnt = np.bincount(np.frexp(err.astype(float))[1].ravel())
+    hist = dict()
+    for k in np.flatnonzero(cnt):
+        label = str(k) if k < 2 else "{}-{}".format(1 << (k - 1), (1 << k) - 1)
+        hist[label] = int(cnt[k])
+    return hist
+
+
+def field_stats(err: np.ndarray, field_names: list, thr_err: int) -> dict:
+    stats = dict()
+    for c_, name in enumerate(field_names):
+        e_ = err[:, c_]
+        stats[name] = {
+            "max_abs": int(e_.max()) if len(e_) > 0 else 0,
+            "mean_abs": round(float(e_.mean()), 4) if len(e_) > 0 else 0.0,
+            "n_err": int(np.count_nonzero(e_ > thr_err)),
+            "hist": error_hist(e_),
+        }
+    return stats
+
+
+# error of the lines grouped by a bin index per line, line_err is the largest
+# error of the line over its fields
+def bin_stats(line_err: np.ndarray, thr_err: int, bins: np.ndarray, n_bin: int):
+    n = np.bincount(bins, minlength=n_bin)
+    n_err = np.bincount(bins, weights=line_err > thr_err, minlength=n_bin)
+    total = np.bincount(bins, weights=line_err, minlength=n_bin)
+    e_max = np.zeros(n_bin, dtype=np.int64)
+    np.maximum.at(e_max, bins, line_err)
+    return [
+        {
+            "bin": b_,
+            "n": int(n[b_]),
+            "n_err": int(n_err[b_]),
+            "max_abs": int(e_max[b_]),
+            "mean_abs": round(float(total[b_] / max(n[b_], 1)), 4),
+        }
+        for b_ in range(n_bin)
+    ]
+
+
+# hit count of each cell of a grid of bins, cells are given as a flat index
+def coverage(cells: np.ndarray, n_cell: int) -> dict:
+    cnt = np.bincount(cells, minlength=n_cell)
+    return {
+        "hit": int(np.count_nonzero(cnt)),
+        "total": n_cell,
+        "ratio": round(np.count_nonzero(cnt) / n_cell, 4),
+        "min_count": int(cnt.min()),
+    }
+
+
+def write_report(filename: str, report: dict) -> None:
+    with open(filename, "w") as f:
+        json.dump(report, f, indent=1)
+
+
+# short summary of a report, at most max_print lines of bin details
+def print_report(report: dict, max_print: int = 20) -> None:
+    print(
+        "Error statistics of {} lines (threshold {}):".format(
+            report["n_line"], report["thr_err"]
+        )
+    )
+    for name, s_ in report["fields"].items():
+        print(
+            "  {}: max {}, mean {:.3f}, {} over threshold".format(
+                name, s_["max_abs"], s_["mean_abs"], s_["n_err"]
+            )
+        )
+    rows = [
+        (k, b_)
+        for k, v in report.get("bins", dict()).items()
+        for b_ in v
+        if b_["n_err"] > 0
+    ]
+    rows.sort(key=lambda r_: -r_[1]["n_err"])  # worst bins first
+    for k, b_ in rows[:max_print]:
+        msg = "  {} {}: {} of {} lines over threshold, max {}, mean {:.3f}".format(
+            k, b_["bin"], b_["n_err"], b_["n"], b_["max_abs"], b_["mean_abs"]
+        )
+        print(verif_utils.ascii_colorize(msg, color="red"))
+    if len(rows) > max_print:
+        print("  ... {} more bins, see the report".format(len(rows) - max_print))
+    for k, c_ in report.get("coverage", dict()).items():
+        print("  coverage of {}: {} of {} bins".format(k, c_["hit"], c_["total"]))
+
+
+# mismatch analytics of a compared pattern pair, bins maps a name to the bin
+# index per line and its number of bins, coverage maps a name to a pair of bin names
+def analyze(
+    dump: str,
+    val_g: np.ndarray,
+    val_d: np.ndarray,
+    width: int,
+    thr_err: int,
+    field_names: list,
+    bins: dict = None,
+    cov: dict = None,
+    max_print: int = 20,
+) -> dict:
+    n_line = min(len(val_g), len(val_d))
+    err = np.zeros((0, len(field_names)), dtype=np.int64)
+    if n_line > 0:
+        err = abs_error(val_g[:n_line], val_d[:n_line], width)
+    line_err = err.max(axis=1, initial=0)
+    report = {
+        "n_golden": len(val_g),
+        "n_dump": len(val_d),
+        "n_line": n_line,
+        "thr_err": thr_err,
+        "fields": field_stats(err, field_names, thr_err),
+    }
+    if bins is not None:
+        report["bins"] = {
+            k: bin_stats(line_err, thr_err, b_[:n_line], n_b)
+            for k, (b_, n_b) in bins.items()
+        }
+    if bins is not None and cov is not None:
+        report["coverage"] = dict()
+        for k, (a, b) in cov.items():
+            (b_a, n_a), (b_b, n_b) = bins[a], bins[b]
+            report["coverage"][k] = coverage(b_a * n_b + b_b, n_a * n_b)
+    report_file = os.path.join(os.path.dirname(dump), report_name)
+    write_report(report_file, report)
+    print_report(report, max_print)
+    print("Report written to {}".format(report_file))
+    return report
@@ -0,0 +1,170 @@
+import os
+import sys
+import json
+import time
+import subprocess
+from contextlib import contextmanager
+
+try:
+    import resource  # not available on windows
+except ImportError:
+    resource = None
+
+report_name = "perf_report.json"
+
+# stage records of this process, in the order the stages finished
+perf_records = list()
+
+
+# on linux the peak rss of this process can be reset, so that each stage gets
+# its own peak; elsewhere ru_maxrss only gives the peak of the process so far
+clear_refs_file = "/proc/self/clear_refs"
+is_stage_peak = os.access(clear_refs_file, os.W_OK)
+open_stages = list()  # peak rss and unreaped child cpu of the open stages
+
+
+def hwm_rss() -> int:
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmHWM:"):
+                return int(line.split()[1]) * 1024
+    return 0
+
+
+def reset_hwm_rss() -> None:
+    with open(clear_refs_file, "w") as f:
+        f.write("5")
+
+
+# cpu seconds of the running processes of a process group and of their finished
+# children, from /proc on linux, None elsewhere; for children that the stage
+# cannot wait for, e.g. a shell and the tool under it in their own session
+def group_cpu(pgid: int):
+    if not os.path.isdir("/proc/{}".format(pgid)):
+        return None
+    ticks = 0
+    for _p in os.listdir("/proc"):
+        if not _p.isdigit():
+            continue
+        try:
+            with open("/proc/{}/stat".format(_p)) as f:
+                fields = f.read().rpartition(")")[2].split()
+        except OSError:
+            continue  # exited meanwhile
+        if int(fields[2]) == pgid:
+            ticks += sum(int(v) for v in fields[11:15])
+    return ticks / os.sysconf("SC_CLK_TCK")
+
+
+# cpu time of a child process that is not reaped by the end of the stage, e.g.
+# a persistent simulator session, counted as child cpu of the open stages
+def add_child_cpu(cpu: float) -> None:
+    for s_ in open_stages:
+        s_["cpu_child"] += cpu
+
+
+def rusage_snapshot() -> dict:
+    snap = {"wall": time.perf_counter(), "cpu": time.process_time()}
+    if resource is not None:
+        # ru_maxrss is in kB on linux and in bytes on macos
+        rss_unit = 1 if sys.platform == "darwin" else 1024
+        r_self = resource.getrusage(resource.RUSAGE_SELF)
+        r_child = resource.getrusage(resource.RUSAGE_CHILDREN)
+        snap["cpu"] = r_self.ru_utime + r_self.ru_stime
+        snap["cpu_child"] = r_child.ru_utime + r_child.ru_stime
+        snap["rss"] = r_self.ru_maxrss * rss_unit
+        snap["rss_child"] = r_child.ru_maxrss * rss_unit
+    return snap
+
+
+# the peak of an inner stage also counts for the stages around it
+def fold_peak(peak: int) -> None:
+    for s_ in open_stages:
+        s_["peak"] = max(s_["peak"], peak)
+
+
+# measure wall time, cpu time and peak rss of a stage, child processes included;
+# stages run in pool workers measure there and return their records
+@contextmanager
+def stage(name: str):
+    start = rusage_snapshot()
+    if is_stage_peak:
+        fold_peak(hwm_rss())
+        reset_hwm_rss()
+    open_stages.append({"peak": 0, "cpu_child": 0.0})
+    try:
+        yield
+    finally:
+        end = rusage_snapshot()
+        own = open_stages.pop()
+        record = {
+            "stage": name,
+            "wall": end["wall"] - start["wall"],
+            "cpu": end["cpu"] - start["cpu"],
+        }
+        if "cpu_child" in end:
+            # children reaped in the stage, and the cpu of unreaped ones
+            record["cpu_child"] = end["cpu_child"] - start["cpu_child"]
+            record["cpu_child"] += own["cpu_child"]
+            # ru_maxrss of the children is that of the largest one reaped so far
+            record["max_rss_child"] = end["rss_child"]
+        if is_stage_peak:
+            record["peak_rss"] = max(own["peak"], hwm_rss())
+            fold_peak(record["peak_rss"])
+        elif "rss" in end:
+            record["max_rss"] = end["rss"]  # peak of the process so far
+        perf_records.append(record)
+
+
+def git_commit(path: str) -> str:
+    try:
+        out = subprocess.check_output(
+            ["git", "rev-parse", "HEAD"], cwd=path, stderr=subprocess.DEVNULL
+        )
+        return out.decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def save_report(work_dir: str, records: list, module_root: str) -> str:
+    report = {
+        "module": os.path.basename(module_root),
+        "commit": git_commit(module_root),
+        "time": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "stages": records,
+    }
+    report_file = os.path.join(work_dir, report_name)
+    with open(report_file, "w") as f:
+        json.dump(report, f, indent=2)
+    return report_file
+
+
+def print_perf_summary(records: list) -> None:
+    fmt = "{:<40} {:>8} {:>8} {:>9} {:>8} {:>12}"
+    sec = lambda r_, k_: "{:.2f}".format(r_[k_]) if k_ in r_ else "-"
+    mb = lambda r_, k_: "{:.1f}".format(r_[k_] / (1 << 20)) if k_ in r_ else "-"
+    rss_key = "peak_rss" if is_stage_peak else "max_rss"
+    print(
+        fmt.format(
+            "Stage",
+            "Wall(s)",
+            "CPU(s)",
+            "Child(s)",
+            "RSS(MB)" if is_stage_peak else "MaxRSS(MB)",
+            "ChildMax(MB)",
+        )
+    )
+    for r_ in records:
+        print(
+            fmt.format(
+                r_["stage"],
+                sec(r_, "wall"),
+                sec(r_, "cpu"),
+                sec(r_, "cpu_child"),
+                mb(r_, rss_key),
+                mb(r_, "max_rss_child"),
+            )
+        )
+    if not is_stage_peak:
+        print("MaxRSS: peak of the process so far, no per-stage peak on this platform")
+    print("ChildMax: largest finished child process so far")
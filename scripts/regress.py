@@ -0,0 +1,232 @@
+import os
+import sys
+import json
+import time
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+import os_utils
+import verif_utils
+import module_utils
+import pat_cache
+import case_history
+import stream_utils
+import vivado_tools as vt
+
+regress_dir_prefix = "regress"
+report_name = "regress_report.json"
+repo_root = os.path.realpath(os.path.join(os.path.dirname(__file__), ".."))
+
+
+# every directory of the repo with a module config
+def discover_modules(root: str = repo_root) -> list:
+    return [
+        os.path.join(root, d)
+        for d in sorted(os.listdir(root))
+        if os.path.exists(os.path.join(root, d, module_utils.config_name))
+    ]
+
+
+# run one task in a pool worker with all its output in a log file,
+# errors and aborts (sys.exit in check_log) are returned instead of raised
+def run_task(log_file, func, *args):
+    t0 = time.perf_counter()
+    sys.stdout.flush()
+    fd_stdout = os.dup(1)
+    with open(log_file, "w") as f:
+        os.dup2(f.fileno(), 1)  # also catches the output of the vivado tools
+        try:
+            result, status = func(*args), "pass"
+        except (Exception, SystemExit) as e:
+            result, status = None, "error: {}".format(e)
+        finally:
+            sys.stdout.flush()
+            os.dup2(fd_stdout, 1)
+            os.close(fd_stdout)
+    return status, result, time.perf_counter() - t0
+
+
+def build_module(cfg):
+    # modules that are only used as submodules have no testbench to elaborate,
+    # their sources are compiled with their parents
+    if cfg["sim"] is not None:
+        vt.module_compile(cfg, w_tb=True)
+        vt.module_elaborate(cfg)
+    return cfg
+
+
+# sim cases of a module, none for modules that are only used as submodules
+def module_cases(cfg) -> list:
+    return vt.list_sim_cases(cfg) if cfg["sim"] is not None else []
+
+
+# rows of the shards of a case merged into one row of the case like the sim
+# summary does, with the shard rows kept under "shards"; cases that never ran
+# are blocked
+def merge_shards(cfg, rows: dict) -> dict:
+    merged = dict()
+    for sim_case, pat_cfg in module_cases(cfg):
+        row = rows.get(sim_case, {"status": "blocked", "wall": 0.0})
+        group = vt.case_group(sim_case, pat_cfg)
+        if group == sim_case:
+            merged[group] = row
+            continue
+        m_row = merged.setdefault(
+            group, {"status": "pass", "wall": 0.0, "errors": 0, "shards": dict()}
+        )
+        m_row["shards"][sim_case] = row
+        m_row["wall"] += row["wall"]
+        if m_row["status"] == "pass":
+            m_row["status"] = row["status"]
+        if "errors" in m_row and "errors" in row:
+            m_row["errors"] += row["errors"]
+        else:
+            m_row.pop("errors", None)  # a shard did not finish its comparison
+    return merged
+
+
+def run_regression(
+    vivado_mode="win_local",
+    n_jobs=1,
+    max_err=None,
+    stream=False,
+    kill_errors=None,
+    use_worker=False,
+):
+    verif_utils.emph_print("REGRESSION")
+    stream = stream and stream_utils.is_supported
+    reg_dir = os_utils.mkdir_w_datetime(repo_root, regress_dir_prefix)
+    cfg_dict, histories = dict(), dict()
+    for m_root in discover_modules():
+        cfg = vt.load_module_config(m_root)
+        vt.create_vivado_dir(cfg, vivado_mode=vivado_mode)
+        cfg["__kill_errors__"] = kill_errors
+        cfg["__sim_worker__"] = use_worker
+        cfg_dict[os.path.basename(m_root)] = cfg
+        histories[os.path.basename(m_root)] = case_history.load_history(
+            cfg["__build_dir__"]
+        )
+    # submodules outside of the repo are compiled as part of their parent only
+    deps = {
+        m_: [_s for _s in cfg["submodules"] or [] if _s in cfg_dict]
+        for m_, cfg in cfg_dict.items()
+    }
+    results = {m_: dict() for m_ in cfg_dict}  # module -> task -> result row
+    outcomes = {m_: dict() for m_ in cfg_dict}  # module -> case -> history entry
+    case_keys = {m_: dict() for m_ in cfg_dict}
+    build_state = {m_: "pending" for m_ in cfg_dict}
+    running = dict()  # future -> (module, task)
+    with ProcessPoolExecutor(max_workers=n_jobs) as pool:
+
+        def submit(m_, task, func, *args):
+            log_file = os.path.join(reg_dir, "{}__{}.log".format(m_, task))
+            running[pool.submit(run_task, log_file, func, *args)] = (m_, task)
+
+        # a module is built once all its submodules are built, and is
+        # blocked if any of them failed, which may cascade up the hierarchy
+        def schedule_builds():
+            is_changed = True
+            while is_changed:
+                is_changed = False
+                for m_ in [_m for _m, _st in build_state.items() if _st == "pending"]:
+                    dep_states = [build_state[_s] for _s in deps[m_]]
+                    if any(_st in ["failed", "blocked"] for _st in dep_states):
+                        build_state[m_] = "blocked"
+                        print("[{}] build: blocked".format(m_))
+                        is_changed = True
+                    elif all(_st == "built" for _st in dep_states):
+                        build_state[m_] = "running"
+                        submit(m_, "build", build_module, cfg_dict[m_])
+
+        schedule_builds()
+        while len(running) > 0:
+            done, _ = wait(list(running), return_when=FIRST_COMPLETED)
+            for fut in done:
+                m_, task = running.pop(fut)
+                status, result, wall = fut.result()
+                row = {"status": status, "wall": wall}
+                if task == "build":
+                    build_state[m_] = "built" if status == "pass" else "failed"
+                    if status == "pass":
+                        if "__lib_dir__" in result:
+                            cfg_dict[m_]["__lib_dir__"] = result["__lib_dir__"]
+                        # previously failing cases first, then the longest ones
+                        for sim_case, pat_cfg in case_history.schedule(
+                            module_cases(result), histories[m_], by_wall=n_jobs > 1
+                        ):
+                            case_keys[m_][sim_case] = vt.case_key(
+                                result, sim_case, pat_cfg
+                            )
+                            submit(
+                                m_,
+                                sim_case,
+                                vt.run_case,
+                                result,
+                                sim_case,
+                                pat_cfg,
+                                max_err,
+                                stream,
+                            )
+                    schedule_builds()
+                elif status == "pass":
+                    cnt_err, row["stages"] = result
+                    row["status"] = "pass" if cnt_err == 0 else "fail"
+                    row["errors"] = cnt_err
+                if task != "build":
+                    outcomes[m_][task] = {
+                        "status": "pass" if row["status"] == "pass" else "fail",
+                        "wall": wall if "stages" in row else None,
+                        "key": case_keys[m_][task],
+                    }
+                results[m_][task] = row
+                print("[{}] {}: {} ({:.2f} s)".format(m_, task, row["status"], wall))
+    for m_, cfg in cfg_dict.items():
+        pat_cache.evict(vt.pat_cache_dir(cfg))
+        case_history.update_history(
+            cfg["__build_dir__"], outcomes[m_], os.path.basename(cfg["__work_dir__"])
+        )
+        build_row = results[m_].get("build", {"status": "blocked", "wall": 0.0})
+        rows = {"build": build_row}
+        rows.update(merge_shards(cfg, results[m_]))
+        results[m_] = rows
+    n_fail = report_regression(reg_dir, cfg_dict, results)
+    for m_, cfg in cfg_dict.items():
+        rows = results[m_]
+        is_pass = all(r_["status"] == "pass" for r_ in rows.values())
+        vt.record_run(
+            cfg,
+            "pass" if is_pass else "fail",
+            cases=list(outcomes[m_]),
+            summary={t_: r_["errors"] for t_, r_ in rows.items() if "errors" in r_},
+        )
+    return n_fail
+
+
+# print the aggregated report in module and config order, return number of failures
+def report_regression(reg_dir, cfg_dict, results):
+    verif_utils.emph_print("REGRESSION SUMMARY")
+    n_fail = 0
+    for m_ in cfg_dict:
+        for task, row in results[m_].items():
+            is_pass = row["status"] == "pass"
+            n_fail += 0 if is_pass else 1
+            status = ascii_status(is_pass)
+            errors = " ({} errors)".format(row["errors"]) if "errors" in row else ""
+            if not is_pass and "errors" not in row:
+                errors = " ({})".format(row["status"])
+            print(
+                "[{}] {}: {}{} {:.2f} s".format(m_, task, status, errors, row["wall"])
+            )
+    report_file = os.path.join(reg_dir, report_name)
+    with open(report_file, "w") as f:
+        json.dump({"repo": repo_root, "results": results}, f, indent=2)
+    print("Regression report: {}".format(report_file))
+    if n_fail == 0:
+        verif_utils.emph_print(verif_utils.pass_string, color="green", bold=True)
+    else:
+        verif_utils.emph_print(verif_utils.fail_string, color="red", bold=True)
+    return n_fail
+
+
+def ascii_status(is_pass):
+    if is_pass:
+        return verif_utils.ascii_colorize("Pass", "green")
+    return verif_utils.ascii_colorize("Fail", "red")
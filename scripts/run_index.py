@@ -0,0 +1,160 @@
+import os
+import json
+import time
+import shutil
+import os_utils
+from datetime import datetime
+
+index_name = "runs.json"
+lock_name = "runs.lock"
+default_keep = 20  # runs kept by the retention cleanup, 0 keeps all
+
+
+# index of the runs of a module, kept next to the build libraries:
+#   runs:   run records by id, in creation order
+#   latest: run id by operation, and by "case:<name>" for simulated cases
+def index_file(build_dir: str) -> str:
+    return os.path.join(build_dir, index_name)
+
+
+def load_index(build_dir: str) -> dict:
+    index = {"runs": dict(), "latest": dict()}
+    if os.path.exists(index_file(build_dir)):
+        with open(index_file(build_dir)) as f:
+            try:
+                index.update(json.load(f))
+            except ValueError:
+                pass  # corrupted index is treated as empty
+    return index
+
+
+def save_index(build_dir: str, index: dict) -> None:
+    os.makedirs(build_dir, exist_ok=True)
+    tmp_file = "{}.{}.tmp".format(index_file(build_dir), os.getpid())
+    with open(tmp_file, "w") as f:
+        json.dump(index, f, indent=2)
+    os.replace(tmp_file, index_file(build_dir))
+
+
+# updates of the index by concurrent runs of a module are serialized
+def index_lock(build_dir: str):
+    return os_utils.file_lock(os.path.join(build_dir, lock_name))
+
+
+# unique result directory of a run, a numeric suffix avoids same-second collisions
+def new_run_dir(module_root: str, prefix: str) -> str:
+    run_id = "{}_{}".format(prefix, datetime.now().strftime("%Y%m%d%H%M%S"))
+    for n_ in range(1000):
+        name = run_id if n_ == 0 else "{}_{}".format(run_id, n_)
+        try:
+            os.mkdir(os.path.join(module_root, name))
+            return os.path.join(module_root, name)
+        except FileExistsError:
+            continue
+    raise OSError("Error: no free run directory for {}".format(run_id))
+
+
+def start_run(build_dir: str, run_dir: str, op: str) -> str:
+    with index_lock(build_dir):
+        run_id = os.path.basename(run_dir)
+        index = load_index(build_dir)
+        index["runs"][run_id] = {
+            "op": op,
+            "dir": run_dir,
+            "started": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "status": "running",
+        }
+        save_index(build_dir, index)
+        return run_id
+
+
+# record inputs and outcome of a run, it becomes the latest of its operation
+# and of each of its cases, a skipped run with no cases is the latest of nothing
+def finish_run(build_dir: str, run_dir: str, status: str, **fields) -> None:
+    with index_lock(build_dir):
+        run_id = os.path.basename(run_dir)
+        index = load_index(build_dir)
+        if run_id not in index["runs"]:
+            return
+        run = index["runs"][run_id]
+        run.update(fields, status=status)
+        run["finished"] = time.strftime("%Y-%m-%d %H:%M:%S")
+        if status != "skipped":
+            index["latest"][run["op"]] = run_id
+        for sim_case in run.get("cases", list()):
+            index["latest"]["case:" + sim_case] = run_id
+        save_index(build_dir, index)
+
+
+def abort_run(build_dir: str, run_dir: str) -> None:
+    with index_lock(build_dir):
+        index = load_index(build_dir)
+        run = index["runs"].get(os.path.basename(run_dir))
+        if run is not None and run["status"] == "running":
+            run["status"] = "aborted"
+            save_index(build_dir, index)
+
+
+# latest finished run of an operation or of a case, None if there is none
+def latest_run(build_dir: str, op: str = None, sim_case: str = None) -> dict:
+    index = load_index(build_dir)
+    run_id = index["latest"].get(op if sim_case is None else "case:" + sim_case)
+    return index["runs"].get(run_id)
+
+
+def run_size(run: dict) -> int:
+    return os_utils.dir_size(run["dir"]) if os.path.isdir(run["dir"]) else 0
+
+
+# delete the oldest runs beyond keep, and then beyond budget MB of result
+# directories, except those that are still the latest of something
+def cleanup(build_dir: str, keep: int = default_keep, budget: float = 0) -> list:
+    with index_lock(build_dir):
+        index = load_index(build_dir)
+        pinned = set(index["latest"].values())
+        removed = list()
+
+        def remove(run_id):
+            shutil.rmtree(index["runs"][run_id]["dir"], ignore_errors=True)
+            del index["runs"][run_id]
+            removed.append(run_id)
+
+        is_removable = (
+            lambda r_: r_ not in pinned and index["runs"][r_]["status"] != "running"
+        )
+        n_run = len(index["runs"])
+        for run_id in list(index["runs"]):
+            if keep <= 0 or n_run - len(removed) <= keep:
+                break
+            if is_removable(run_id):
+                remove(run_id)
+        if budget > 0:
+            sizes = {r_: run_size(run) for r_, run in index["runs"].items()}
+            total = sum(sizes.values())
+            for run_id in [r_ for r_ in index["runs"] if is_removable(r_)]:
+                if total <= budget * (1 << 20):
+                    break
+                remove(run_id)
+                total -= sizes[run_id]
+        save_index(build_dir, index)
+        return removed
+
+
+def show_runs(build_dir: str) -> None:
+    index = load_index(build_dir)
+    latest = set(index["latest"].values())
+    total = 0
+    for run_id, run in index["runs"].items():
+        size = run_size(run)
+        total += size
+        print(
+            "{} {:<24} {:<5} {:<8} {}  {:>9.2f} MB".format(
+                "*" if run_id in latest else " ",
+                run_id,
+                run["op"],
+                run["status"],
+                run["started"],
+                size / (1 << 20),
+            )
+        )
+    print("{} runs, {:.2f} MB".format(len(index["runs"]), total / (1 << 20)))
@@ -0,0 +1,246 @@
+import os
+import sys
+import time
+import random
+import argparse
+import subprocess
+
+# vivado settings
+vivado_ver = "2019.1"
+vivado_path = {
+    "win_local": r"C:\Xilinx\Vivado\{}\bin".format(vivado_ver),
+    "linux_local": r"/tools/Xilinx/Vivado/{}/bin".format(vivado_ver),
+    "linux_ci": r"/opt/Xilinx/Vivado/{}/bin".format(vivado_ver),
+    "path": "",  # resolve tools from PATH, e.g. stub tools for testing
+}
+
+
+# interface of a simulator backend; all tools run in a shell, in the library
+# directory (compile, elaborate) or in the case directory (simulate, view),
+# and write xvhdl.log, xelab.log and xsim.log there like the vivado tools
+class sim_backend:
+    name = ""
+    comp_opt = ""  # options are part of the build cache keys
+    elab_opt = ""
+
+    def compile(self, build_dir: str, src_files: list, comp_opt: str) -> None:
+        raise NotImplementedError
+
+    def elaborate(self, build_dir: str, top_name: str) -> None:
+        raise NotImplementedError
+
+    # batch simulation of a case with its tcl file, run and watched by the caller
+    def sim_cmd(self, top_name: str, tcl_name: str) -> str:
+        raise NotImplementedError
+
+    # interactive session on the snapshot, tcl commands come over stdin
+    def session_cmd(self, top_name: str) -> str:
+        raise NotImplementedError
+
+    def view(self, sim_path: str, top_name: str, wcfg_files: list) -> None:
+        raise NotImplementedError
+
+
+class vivado_backend(sim_backend):
+    name = "vivado"
+    comp_opt = " -v 0"  # use -2008 only in simulation, not linting
+    elab_opt = " -debug typical -v 0 -mt off -stat"
+    sim_opt = ""
+
+    def __init__(self, tool_path: str = "") -> None:
+        self.tool_path = tool_path
+
+    def tool_cmd(self, tool: str, opt: str) -> str:
+        return os.path.join(self.tool_path, tool) + opt
+
+    def compile(self, build_dir: str, src_files: list, comp_opt: str) -> None:
+        cmd = r"{} {}".format(self.tool_cmd("xvhdl", comp_opt), " ".join(src_files))
+        subprocess.call(cmd, shell=True, cwd=build_dir)
+
+    def elaborate(self, build_dir: str, top_name: str) -> None:
+        cmd = r"{0} {1} -s {1}_sim".format(
+            self.tool_cmd("xelab", self.elab_opt), top_name
+        )
+        subprocess.call(cmd, shell=True, cwd=build_dir)
+
+    def sim_cmd(self, top_name: str, tcl_name: str) -> str:
+        return r"{0} {1}_sim -t {2}".format(
+            self.tool_cmd("xsim", self.sim_opt), top_name, tcl_name
+        )
+
+    def session_cmd(self, top_name: str) -> str:
+        return r"{0} {1}_sim".format(self.tool_cmd("xsim", self.sim_opt), top_name)
+
+    def view(self, sim_path: str, top_name: str, wcfg_files: list) -> None:
+        wcfg_flags = "".join(" -view {}".format(_f) for _f in wcfg_files)
+        cmd = r"{0} {1}_sim.wdb {2} -gui".format(
+            self.tool_cmd("xsim", self.sim_opt), top_name, wcfg_flags
+        )
+        subprocess.call(cmd, shell=True, cwd=sim_path)
+
+
+# deterministic stand-in of the vivado tools, this script run as xvhdl, xelab
+# or xsim; the simulation writes the golden patterns back as the DUT dump
+fake_settings = {
+    "latency": 0.0,  # seconds per simulated case
+    "line_time": 0.0,  # seconds per line of the dump
+    "error_rate": 0.0,  # probability of a corrupted dump line
+    "log_errors": 0,  # errors written to xsim.log per case
+    "out_ratio": 1.0,  # lines of the dump per line of the golden patterns
+    "seed": 0,  # of the corrupted lines, together with the case name
+}
+
+
+class fake_backend(vivado_backend):
+    name = "fake"
+    comp_opt = " -v 0 -fake"
+    elab_opt = " -v 0 -fake"
+
+    def __init__(self, sim_cfg: dict = None) -> None:
+        super().__init__()
+        sim_cfg = sim_cfg or dict()
+        settings = dict(fake_settings)
+        for k, v in (sim_cfg.get("fake_backend") or dict()).items():
+            assert k in fake_settings, "Error: unknown fake backend setting {}".format(
+                k
+            )
+            settings[k] = v
+        names = {
+            "golden": sim_cfg.get("pat_out", "pat_out.txt"),
+            "dump": sim_cfg.get("dut_out", "dut_out.txt"),
+            "stimulus": sim_cfg.get("pat_in", "pat_in.txt"),
+        }
+        self.sim_opt = "".join(
+            " --{} {}".format(k.replace("_", "-"), v)
+            for k, v in list(names.items()) + list(settings.items())
+        )
+
+    def tool_cmd(self, tool: str, opt: str) -> str:
+        return '"{}" "{}" {}{}'.format(
+            sys.executable, os.path.realpath(__file__), tool, opt
+        )
+
+    def view(self, sim_path: str, top_name: str, wcfg_files: list) -> None:
+        print("No waveforms in the fake backend, see the logs in {}".format(sim_path))
+
+
+def get_backend(vivado_mode: str, sim_cfg: dict = None) -> sim_backend:
+    if vivado_mode == "fake":
+        return fake_backend(sim_cfg)
+    return vivado_backend(vivado_path[vivado_mode])
+
+
+# golden lines as text, from the binary sidecar if there is no text file
+def fake_golden(golden: str) -> list:
+    if os.path.isfile(golden):
+        with open(golden) as f:
+            return [line.rstrip("\n") for line in f]
+    npy_file = os.path.splitext(golden)[0] + ".npy"
+    if not os.path.isfile(npy_file):
+        return None
+    import numpy as np
+    import hex_codec
+
+    value = np.load(npy_file)
+    width = value.dtype.itemsize * 8
+    return (
+        hex_codec.encode_lines(value.T, [width] * value.shape[1])
+        .decode()
+        .split("\n")[:-1]
+    )
+
+
+# flip a bit of the leading digit, far beyond any comparator tolerance
+def fake_corrupt(line: str) -> str:
+    return "{:x}".format(int(line[0], 16) ^ 0x4) + line[1:] if line else "x"
+
+
+def fake_run(args, log) -> None:
+    log.write("INFO: [fake] run in {}\n".format(os.getcwd()))
+    if os.path.exists(args.stimulus):  # the testbench reads all of it, maybe a pipe
+        with open(args.stimulus) as f:
+            n_in = sum(1 for _ in f)
+        log.write("INFO: [fake] read {} lines of {}\n".format(n_in, args.stimulus))
+    golden = fake_golden(args.golden)
+    if golden is None:
+        log.write("ERROR: [fake] no golden patterns {}\n".format(args.golden))
+        return
+    n_out = round(len(golden) * args.out_ratio) if len(golden) > 0 else 0
+    time.sleep(args.latency + args.line_time * n_out)
+    rng = random.Random("{}:{}".format(args.seed, os.path.basename(os.getcwd())))
+    n_corrupt = 0
+    with open(args.dump, "w") as f:
+        for i in range(n_out):
+            line = golden[i % len(golden)]
+            if args.error_rate > 0 and rng.random() < args.error_rate:
+                line = fake_corrupt(line)
+                n_corrupt += 1
+            f.write(line + "\n")
+    log.write(
+        "INFO: [fake] wrote {} lines to {}, {} corrupted\n".format(
+            n_out, args.dump, n_corrupt
+        )
+    )
+    for i in range(args.log_errors):
+        log.write("ERROR: [fake] injected error {}\n".format(i))
+
+
+# tcl commands of a batch run or a session; the case runs at its first "run"
+# after a start, cd or restart
+def fake_tcl(args, cmds, log, state: dict) -> bool:
+    for cmd in cmds:
+        words = cmd.split()
+        if len(words) == 0:
+            continue
+        if words[0] == "cd":
+            os.chdir(cmd.split(None, 1)[1].strip().strip("{}"))
+            state["is_run"] = False
+        elif words[0] == "restart":
+            state["is_run"] = False
+        elif words[0] == "run" and not state["is_run"]:
+            fake_run(args, log)
+            state["is_run"] = True
+        elif words[0] == "log_wave":
+            log.write("INFO: [fake] logging waves of {}\n".format(words[-1]))
+        elif words[0] == "puts":
+            log.write(cmd.split(None, 1)[1] + "\n")
+        elif words[0] in ["quit", "exit"]:
+            return False
+        log.flush()
+    return True
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fake vivado tools")
+    parser.add_argument("tool", choices=["xvhdl", "xelab", "xsim"])
+    parser.add_argument("files", nargs="*")
+    for opt in ["-v", "-debug", "-mt", "-s", "-t"]:
+        parser.add_argument(opt)
+    for opt in ["-2008", "-stat", "-fake"]:
+        parser.add_argument(opt, action="store_true")
+    parser.add_argument("--golden", default="pat_out.txt")
+    parser.add_argument("--dump", default="dut_out.txt")
+    parser.add_argument("--stimulus", default="pat_in.txt")
+    for k, v in fake_settings.items():
+        parser.add_argument("--" + k.replace("_", "-"), type=type(v), default=v)
+    args = parser.parse_intermixed_args()
+    state = {"is_run": False}
+    if args.tool == "xvhdl":
+        os.makedirs(os.path.join("xsim.dir", "work"), exist_ok=True)
+        with open("xvhdl.log", "w") as log:
+            for _f in args.files:
+                if os.path.isfile(_f):
+                    log.write("INFO: [fake] analyzing {}\n".format(_f))
+                else:
+                    log.write("ERROR: [fake] no such file {}\n".format(_f))
+    elif args.tool == "xelab":
+        os.makedirs(os.path.join("xsim.dir", args.s), exist_ok=True)
+        with open("xelab.log", "w") as log:
+            log.write("INFO: [fake] elaborated {}\n".format(" ".join(args.files)))
+    elif args.t is not None:
+        with open("xsim.log", "w") as log, open(args.t) as f:
+            fake_tcl(args, f.read().splitlines(), log, state)
+    else:
+        for line in sys.stdin:  # session, its output is the log
+            if not fake_tcl(args, [line.strip()], sys.stdout, state):
+                break
@@ -0,0 +1,123 @@
+import os
+import subprocess
+from multiprocessing import util
+import log_scanner
+import perf_utils
+
+done_marker = "__sim_worker_case_done__"
+end_cmds = ["quit", "exit"]  # lines of sim.tcl that would end the session
+
+# open sessions of this process, by simulator command and directory
+workers = dict()
+
+
+# one interactive xsim session on a snapshot, fed with tcl commands over stdin;
+# the snapshot is loaded once, then each case is restarted in its own directory
+class sim_worker:
+    def __init__(self, cmd: str, cwd: str) -> None:
+        self.cmd = cmd
+        self.cwd = cwd
+        self.proc = None
+        self.n_case = 0
+
+    def start(self) -> None:
+        self.proc = subprocess.Popen(
+            self.cmd,
+            shell=True,
+            cwd=self.cwd,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            universal_newlines=True,
+            bufsize=1,
+            start_new_session=os.name != "nt",
+        )
+        self.n_case = 0
+
+    def is_alive(self) -> bool:
+        return self.proc is not None and self.proc.poll() is None
+
+    def case_cmds(self, case_dir: str, tcl_file: str) -> list:
+        cmds = ["cd {{{}}}".format(case_dir)]
+        if self.n_case > 0:
+            cmds.append("restart")
+        with open(tcl_file) as f:
+            for line in f:
+                if line.split()[:1] not in [[c_] for c_ in end_cmds]:
+                    cmds.append(line.rstrip())
+        cmds.append("puts {}".format(done_marker))
+        return cmds
+
+    # run the sim.tcl of a case, the session output of the case goes to log_file;
+    # returns False if the session ended or was killed before the case finished
+    def run_case(self, case_dir: str, tcl_file: str, log_file: str, scanner=None):
+        if scanner is None:
+            scanner = log_scanner.log_scanner(log_file)
+        if not self.is_alive():
+            self.start()
+        cmds = self.case_cmds(case_dir, tcl_file)
+        self.n_case += 1
+        cpu_start = perf_utils.group_cpu(self.proc.pid)
+        is_done, is_killed = False, False
+        with open(log_file, "w") as f_log:
+            try:
+                self.proc.stdin.write("".join(c_ + "\n" for c_ in cmds))
+                self.proc.stdin.flush()
+                lines = self.proc.stdout
+            except OSError:
+                lines = []
+            for line in lines:
+                if line.strip() == done_marker:
+                    is_done = True
+                    break
+                f_log.write(line)
+                scanner.scan_text(line)
+                if scanner.is_abort():
+                    is_killed = True
+                    print(
+                        "Killed simulator session after {} errors{}".format(
+                            scanner.cnt_err, " (fatal)" if scanner.is_fatal else ""
+                        )
+                    )
+                    break
+            if not (is_done or is_killed):
+                msg = "ERROR: simulator session ended before the case finished\n"
+                f_log.write(msg)
+                scanner.scan_text(msg)
+        if not is_done:
+            self.close(kill=True)  # a fresh session for the next case
+        elif cpu_start is not None:
+            # the session is not reaped in the stage of the case, a closed one is
+            cpu_end = perf_utils.group_cpu(self.proc.pid)
+            perf_utils.add_child_cpu(max((cpu_end or cpu_start) - cpu_start, 0.0))
+        return is_done
+
+    def close(self, kill: bool = False) -> None:
+        if self.proc is None:
+            return
+        if kill:
+            log_scanner.kill_tree(self.proc)
+        else:
+            try:
+                self.proc.stdin.write("quit\n")
+                self.proc.stdin.close()
+            except OSError:
+                pass
+        self.proc.wait()
+        self.proc = None
+
+
+def get_worker(cmd: str, cwd: str) -> sim_worker:
+    if (cmd, cwd) not in workers:
+        workers[(cmd, cwd)] = sim_worker(cmd, cwd)
+    return workers[(cmd, cwd)]
+
+
+def close_all() -> None:
+    for w_ in workers.values():
+        w_.close()
+    workers.clear()
+
+
+# also runs on exit of pool processes, which skip atexit handlers
+util.Finalize(None, close_all, exitpriority=0)
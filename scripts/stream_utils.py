@@ -0,0 +1,52 @@
+import os
+import errno
+from concurrent.futures import wait
+
+# named pipes are posix only, other platforms simulate on plain files
+is_supported = hasattr(os, "mkfifo")
+poll_interval = 0.05  # seconds
+
+
+def make_fifo(path: str) -> None:
+    if os.path.lexists(path):
+        os.remove(path)
+    os.mkfifo(path)
+
+
+# feed text chunks into a fifo, the reader may stop early
+def write_fifo(path: str, chunks) -> int:
+    n_byte = 0
+    try:
+        with open(path, "w") as f:
+            for c_ in chunks:
+                f.write(c_)
+                n_byte += len(c_)
+    except BrokenPipeError:
+        pass
+    return n_byte
+
+
+# release a writer whose reader is gone: open a read end and discard the data
+def drain_fifo(path: str, fut) -> None:
+    while not fut.done():
+        fd = os.open(path, os.O_RDONLY | os.O_NONBLOCK)
+        try:
+            while len(os.read(fd, 1 << 16)) > 0:
+                pass
+        except BlockingIOError:
+            pass
+        finally:
+            os.close(fd)
+        wait([fut], timeout=poll_interval)
+
+
+# release a reader whose writer is gone: a transient write end gives it an EOF
+# after the buffered data, so nothing is lost
+def close_fifo(path: str, fut) -> None:
+    while not fut.done():
+        try:
+            os.close(os.open(path, os.O_WRONLY | os.O_NONBLOCK))
+        except OSError as e:
+            if e.errno != errno.ENXIO:  # no reader has the fifo open right now
+                raise
+        wait([fut], timeout=poll_interval)
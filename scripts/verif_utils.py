@@ -1,12 +1,23 @@
+from __future__ import annotations
 import os
 import sys
+import contextlib
 from math import ceil
-from typing import Any, Union, Callable
+from itertools import zip_longest
+from typing import Any, Union, Callable, Optional
 import os_utils
 import module_utils
+import log_scanner
+
+# loaded on first use, reports and log checks do not need numpy
+np = os_utils.lazy_import("numpy")
+hex_codec = os_utils.lazy_import("hex_codec")
+comp_service = os_utils.lazy_import("comp_service")
 
 fail_string = "FAIL @__@"
 pass_string = "PASS ^__^"
+tolerance_block = 1 << 16  # lines checked at once when the check may stop early
+time_units = {"fs": 1e-6, "ps": 1e-3, "ns": 1, "us": 1e3, "ms": 1e6, "s": 1e9}
 
 
 def ascii_colorize(x: str, color: str, bold: bool = False) -> str:
@@ -37,11 +48,11 @@ def emph_print(x: Any, deco: str = "*", color: str = "", bold: bool = False) ->
     print(msg)
 
 
-def check_log(filename: str) -> None:
-    kw_list = ["error", "fatal_error"]
-    cnt_err = 0
-    for kw in kw_list:
-        cnt_err += os_utils.count_keyword(filename, kw)
+def check_log(filename: str, cnt_err: Optional[int] = None) -> None:
+    # the count may come from a scanner that already tailed the log
+    if cnt_err is None:
+        assert os.path.exists(filename)
+        cnt_err = log_scanner.log_scanner(filename).finish()
     print("Checking {}: {} errors".format(filename, cnt_err))
     if cnt_err != 0:
         emph_print(fail_string, color="red", bold=True)
@@ -62,34 +73,70 @@ def line_diff(golden: str, dump: str, line_id: int) -> int:
     return 0
 
 
-# default pattern checking method
+# drops what is printed inside, for the mismatches that f_diff callbacks print
+# beyond the first max_print ones
+@contextlib.contextmanager
+def quiet_output():
+    with open(os.devnull, "w") as f_null, contextlib.redirect_stdout(f_null):
+        yield
+
+
+# default pattern checking method, streaming both files line by line
 def check_pat_diff(
-    golden: str, dump: str, f_diff: Callable[[str, str, int], int] = line_diff
+    golden: str,
+    dump: str,
+    f_diff: Callable[[str, str, int], int] = line_diff,
+    max_err: Optional[int] = None,
+    max_print: int = 20,
 ) -> int:
     assert os.path.exists(golden), "Error: No pattern {}".format(golden)
     assert os.path.exists(dump), "Error: No DUT dump {}".format(dump)
-    cnt_err, cnt = 0, 0
-    line_g, line_d = list(), list()
+    cnt_err, cnt_g, cnt_d, is_stopped = 0, 0, 0, False
     with open(golden) as f_g, open(dump) as f_d:
-        line_g = [l.strip().lower() for l in f_g]
-        line_d = [l.strip().lower() for l in f_d]
-    for lg, ld in zip(line_g, line_d):
-        cnt += 1
-        cnt_err += f_diff(lg, ld, cnt)
-    if len(line_g) != len(line_d):
+        lines = zip_longest(f_g, f_d)
+        # lines up to the max_print-th mismatch are checked printing, the rest quietly
+        for is_quiet in [False, True] if max_print > 0 else [True]:
+            with quiet_output() if is_quiet else contextlib.nullcontext():
+                for lg, ld in lines:
+                    if max_err is not None and cnt_err >= max_err:
+                        is_stopped = True
+                        break
+                    cnt_g += lg is not None
+                    cnt_d += ld is not None
+                    if lg is None or ld is None:
+                        continue  # only count the remaining lines of the longer file
+                    cnt_err += f_diff(lg.strip().lower(), ld.strip().lower(), cnt_g)
+                    if not is_quiet and cnt_err >= max_print:
+                        break
+            if is_stopped:
+                break
+    if is_stopped:
+        print(ascii_colorize("Stopped after {} mismatches".format(cnt_err), "red"))
+    elif cnt_g != cnt_d:
         print(
             ascii_colorize(
                 "Mismatch at end: lines of expected {} != result {}".format(
-                    len(line_g), len(line_d)
+                    cnt_g, cnt_d
                 ),
                 color="red",
             )
         )
-        cnt_err += abs(len(line_g) - len(line_d))
+        cnt_err += abs(cnt_g - cnt_d)
+    print_diff_summary(dump, cnt_err, max_print)
+    return cnt_err
+
+
+def print_diff_summary(dump: str, cnt_err: int, max_print: int = 20) -> None:
+    if cnt_err > max_print:
+        print(
+            ascii_colorize(
+                "... {} more mismatches not shown".format(cnt_err - max_print),
+                color="red",
+            )
+        )
     print("Checking {}: {} errors".format(dump, cnt_err))
     if cnt_err != 0:
         emph_print(fail_string, color="red", bold=True)
-    return cnt_err
 
 
 def check_sim_summary(sim_summary: dict) -> None:
@@ -108,25 +155,157 @@ def check_sim_summary(sim_summary: dict) -> None:
         sys.exit("Simulation finished with errors!")  # throw error
 
 
-def signed_hex2int(hexstr: str, width: int) -> int:
-    value = int(hexstr, width)
-    if value & (1 << (width - 1)):
-        value -= 1 << width
-    return value
+# scale a simulation time like "20 ms", rounded up to whole ns
+def scale_time(sim_time: str, scale: float) -> str:
+    value, unit = sim_time.split()
+    assert unit in time_units, "Error: invalid time unit: {}".format(sim_time)
+    return "{} ns".format(ceil(float(value) * time_units[unit] * scale))
+
+
+# scalar codec of hex strings, see hex_codec for whole columns
+def signed_hex2int(hexstr: str, width: int, signed: bool = True) -> int:
+    return hex_codec.hex2int(hexstr, width, signed)
+
+
+def int2hex(value: int, width: int) -> str:
+    return hex_codec.int2hex(value, width)
+
+
+# load a file of space separated hex columns into a signed integer array
+def load_hex_array(filename: str, width: int) -> np.ndarray:
+    assert os.path.exists(filename), "Error: No pattern {}".format(filename)
+    with open(filename, "rb") as f:
+        return hex_codec.decode_lines(f.read(), width)
+
+
+# binary sidecar of a text pattern file, e.g. pat_out.npy for pat_out.txt
+def npy_name(filename: str) -> str:
+    return os.path.splitext(filename)[0] + ".npy"
+
+
+# smallest signed integer type holding values of the given bit width
+def pat_dtype(width: int) -> np.dtype:
+    for w_ in [8, 16, 32]:
+        if width <= w_:
+            return np.dtype("int{}".format(w_))
+    return np.dtype(np.int64)
+
+
+def save_pat_array(filename: str, columns: tuple, width: int) -> None:
+    # wrap into the signed range, same as decoding the hex text would do
+    value = np.stack([hex_codec.wrap_signed(c_, width) for c_ in columns], axis=1)
+    np.save(npy_name(filename), value.astype(pat_dtype(width)))
+
+
+# pattern values from the binary sidecar if there is one, otherwise from hex text
+def load_pat_array(filename: str, width: int) -> np.ndarray:
+    if os.path.exists(npy_name(filename)):
+        return np.load(npy_name(filename), mmap_mode="r")
+    return load_hex_array(filename, width)
+
+
+def pat_exists(filename: str) -> bool:
+    return os.path.exists(filename) or os.path.exists(npy_name(filename))
 
 
-def int2hex(intval: int, width: int) -> str:
-    tmp = intval
-    if intval < 0:
-        tmp += 1 << width
-    mask = (1 << width) - 1
-    tmp &= mask
-    fmt = "{{:0{}x}}".format(ceil(width / 4))
-    return fmt.format(tmp)
+def load_pat_pair(golden: str, dump: str, width: int) -> tuple:
+    assert pat_exists(golden), "Error: No pattern {}".format(golden)
+    assert pat_exists(dump), "Error: No DUT dump {}".format(dump)
+    return load_pat_array(golden, width), load_pat_array(dump, width)
+
+
+# fields over tolerance of each line, values may wrap around the signed range
+def tolerance_errors(
+    val_g: np.ndarray, val_d: np.ndarray, width: int, thr_err: int
+) -> np.ndarray:
+    diff = np.abs(val_g.astype(np.int64) - val_d)
+    # exception if one is close to the max and another is close to the min
+    return (diff > thr_err) & ~(np.abs(diff - (1 << width)) < thr_err)
+
+
+# bulk pattern checking with absolute tolerance; with max_err, lines are
+# checked block by block and the check stops like check_pat_diff does
+def check_pat_tolerance(
+    golden: str,
+    dump: str,
+    width: int,
+    thr_err: int,
+    field_names: Optional[list] = None,
+    max_print: int = 20,
+    values: Optional[tuple] = None,
+    max_err: Optional[int] = None,
+) -> int:
+    # values of both files, if the caller already loaded them
+    val_g, val_d = load_pat_pair(golden, dump, width) if values is None else values
+    n_line = min(len(val_g), len(val_d))
+    if n_line > 0:
+        assert val_g.shape[1] == val_d.shape[1], "Error: column mismatch"
+    block = max(n_line, 1) if max_err is None else tolerance_block
+    err_lines = list()
+    for l0 in range(0, n_line, block):
+        l1 = min(l0 + block, n_line)
+        is_err = tolerance_errors(val_g[l0:l1], val_d[l0:l1], width, thr_err)
+        err_lines += (np.flatnonzero(is_err.any(axis=1)) + l0).tolist()
+        if max_err is not None and len(err_lines) >= max_err:
+            break
+    is_stopped = False
+    if max_err is not None and len(err_lines) >= max_err:
+        err_lines = err_lines[:max_err]
+        # the line check stops if any line follows the last counted one
+        last = err_lines[-1] + 1 if len(err_lines) > 0 else 0
+        is_stopped = last < max(len(val_g), len(val_d))
+    if field_names is None:
+        field_names = ["field{}".format(i) for i in range(val_g.shape[1])]
+    for i in err_lines[:max_print]:
+        err_msg = ""
+        is_err = tolerance_errors(val_g[i], val_d[i], width, thr_err)
+        for c_ in np.flatnonzero(is_err):
+            err_msg += "\n  {}: expected({}) differ from result({}) too much!".format(
+                field_names[c_],
+                int2hex(int(val_g[i, c_]), width),
+                int2hex(int(val_d[i, c_]), width),
+            )
+        print(ascii_colorize("Mismatch at line {}:{}".format(i + 1, err_msg), "red"))
+    if len(err_lines) > max_print:
+        print(
+            ascii_colorize(
+                "... {} more mismatches not shown".format(len(err_lines) - max_print),
+                color="red",
+            )
+        )
+    cnt_err = len(err_lines)
+    if is_stopped:
+        print(ascii_colorize("Stopped after {} mismatches".format(cnt_err), "red"))
+    elif len(val_g) != len(val_d):
+        print(
+            ascii_colorize(
+                "Mismatch at end: lines of expected {} != result {}".format(
+                    len(val_g), len(val_d)
+                ),
+                color="red",
+            )
+        )
+        cnt_err += abs(len(val_g) - len(val_d))
+    print("Checking {}: {} errors".format(dump, cnt_err))
+    if cnt_err != 0:
+        emph_print(fail_string, color="red", bold=True)
+    return cnt_err
 
 
 class pattern_comparator:
-    def __init__(self, golden: Union[list, str], dump: Union[list, str]) -> None:
+    def __init__(
+        self,
+        golden: Union[list, str],
+        dump: Union[list, str],
+        max_err: Optional[int] = None,
+        comp_mode: Optional[str] = None,
+        n_jobs: int = 1,
+        with_stats: Optional[bool] = None,
+    ) -> None:
+        self.max_err = max_err  # stop checking a pattern after this many mismatches
+        self.comp_mode = comp_mode  # for comparators with several modes
+        self.n_jobs = n_jobs  # processes checking the pairs and chunks of large files
+        self.with_stats = with_stats  # mismatch statistics, None for the default
         self.pattern_list = []
         msg = "Error: Invalid pattern settings"
         if isinstance(golden, str) and isinstance(dump, str):
@@ -137,21 +316,48 @@ class pattern_comparator:
         else:
             raise TypeError(msg)
 
+    # whether the comparison reads the .npy sidecar of the expected outputs, as
+    # written by generated cases with pat_format: npy instead of the hex text
+    @classmethod
+    def reads_arrays(cls, mode: Optional[str]) -> bool:
+        return False
+
+    # check of a single line, for the mismatch windows of a failing dump
+    def diff_line(self, golden: str, dump: str, line_id: int) -> int:
+        return line_diff(golden, dump, line_id)
+
     # call entry
     def run(self) -> int:
-        cnt_err = 0
-        for p_, d_ in self.pattern_list:
-            cnt_err += check_pat_diff(p_, d_)
-        return cnt_err
+        return sum(
+            comp_service.check_pairs(
+                list(self.pattern_list), max_err=self.max_err, n_jobs=self.n_jobs
+            )
+        )
 
 
 class pattern_generator:
-    def __init__(self, pat_cfg: dict) -> None:
+    def __init__(self, pat_cfg: dict, work_dir: str = ".") -> None:
         self.pat_cfg = pat_cfg
+        self.work_dir = work_dir
+        # "txt": hex text only, "npy": binary arrays, text only for the testbench input
+        self.pat_format = self.pat_cfg.get("pat_format", "txt")
         if "timeout" not in self.pat_cfg:
             self.pat_cfg["timeout"] = "1 ms"  # default timeout
-        module_utils.create_sim_tcl(".", self.pat_cfg["timeout"])
+        timeout = self.pat_cfg["timeout"]
+        # shard i of n only generates its slice of the patterns, in proportional time
+        n_pat = self.pat_cfg.get("n_pat", 0)
+        self.pat_range = (0, n_pat)
+        if "shard" in self.pat_cfg:
+            i_, n_ = self.pat_cfg["shard"]
+            self.pat_range = (n_pat * i_ // n_, n_pat * (i_ + 1) // n_)
+            scale = (self.pat_range[1] - self.pat_range[0]) / max(n_pat, 1)
+            timeout = scale_time(timeout, scale)
+        module_utils.create_sim_tcl(self.work_dir, timeout)
 
     # call entry
     def run(self) -> None:
         pass
+
+    # text chunks of each pattern file by name, for streaming them through pipes
+    def gen_text(self) -> dict:
+        raise NotImplementedError
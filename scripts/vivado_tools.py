@@ -1,44 +1,55 @@
 import os
-import subprocess
+import sys
+import json
 from fnmatch import fnmatch
 import importlib
-from ruamel import yaml
+from contextlib import contextmanager
 import os_utils
 import verif_utils
 import module_utils
 
-# vivado settings
-vivado_ver = "2019.1"
-vivado_path = {
-    "win_local": r"C:\Xilinx\Vivado\{}\bin".format(vivado_ver),
-    "linux_local": r"/tools/Xilinx/Vivado/{}/bin".format(vivado_ver),
-    "linux_ci": r"/opt/Xilinx/Vivado/{}/bin".format(vivado_ver),
-}
-vivado_comp_opt = " -v 0"  # use -2008 only in simulation, not linting
-vivado_elab_opt = " -debug typical -v 0 -mt off -stat"
-vivado_sim_opt = ""
-vivado_comp = "xvhdl"
-vivado_elab = "xelab"
-vivado_sim = "xsim"
+# only loaded by the operations and workers that use them, e.g. view, cache and
+# runs never load the log scanner, the case history or the artifact manager
+build_cache = os_utils.lazy_import("build_cache")
+pat_cache = os_utils.lazy_import("pat_cache")
+perf_utils = os_utils.lazy_import("perf_utils")
+log_scanner = os_utils.lazy_import("log_scanner")
+run_index = os_utils.lazy_import("run_index")
+sim_backend = os_utils.lazy_import("sim_backend")
+case_history = os_utils.lazy_import("case_history")
+artifacts = os_utils.lazy_import("artifacts")
+stream_utils = os_utils.lazy_import("stream_utils")
+sim_worker = os_utils.lazy_import("sim_worker")
+
 work_dir_prefix = "work"
+shard_sep = ".shard"  # shard i of a generated case runs as "<case>.shard<i>"
 
-vivado_cmd = lambda path, cmd, opt: os.path.join(path, cmd) + opt
 
+def parse_module_config(config_name=module_utils.config_name, module_root=None):
+    if module_root is None:
+        module_root = os.getcwd()
+    config_file = os.path.join(module_root, config_name)
+    assert os.path.exists(config_file)
+    from ruamel import yaml  # only needed when the config cache is stale
 
-def parse_module_config(config_name=module_utils.config_name):
-    assert os.path.exists(config_name)
     cfg = dict()
-    with open(config_name) as f:
+    with open(config_file) as f:
         cfg = yaml.load(f, Loader=yaml.Loader)
     # process file list into string
-    cfg["__module_root__"] = os.path.realpath(os.getcwd())
+    cfg["__module_root__"] = os.path.realpath(module_root)
+    # files and wildcard directories the parsed config depends on
+    cfg["__config_deps__"] = [os.path.realpath(config_file)]
     cfg_src = cfg["src_list"]
     for _s in cfg_src:
         if cfg_src[_s] is None:
             cfg_src[_s] = []
         elif isinstance(cfg_src[_s], str):
             if "*" in cfg_src[_s]:  # wildcard match
-                cfg_src[_s] = [_f for _f in os.listdir(_s) if fnmatch(_f, cfg_src[_s])]
+                _dir = os.path.join(cfg["__module_root__"], _s)
+                cfg_src[_s] = [
+                    _f for _f in os.listdir(_dir) if fnmatch(_f, cfg_src[_s])
+                ]
+                cfg["__config_deps__"].append(_dir)
             else:
                 cfg_src[_s] = cfg_src[_s].split()
         assert isinstance(cfg_src[_s], list), "Error: invalid {}: {}".format(
@@ -50,153 +61,671 @@ def parse_module_config(config_name=module_utils.config_name):
     return cfg
 
 
-def create_vivado_dir(cfg, vivado_mode="win_local", gen_work_dir=True):
-    # vivado path
-    cfg["__vivado_path__"] = vivado_path[vivado_mode]
-    # create working directory
+# modification stamps of the config dependencies, None for a missing one
+def config_stamp(deps: list) -> list:
+    stamp = list()
+    for _f in deps:
+        try:
+            st = os.stat(_f)
+            stamp.append([_f, st.st_mtime_ns, st.st_size])
+        except OSError:
+            stamp.append([_f, None, None])
+    return stamp
+
+
+# the parsed config is cached in the build directory, so that operations and
+# workers skip loading ruamel.yaml as long as config.yml is unchanged
+config_cache_name = "config_cache.json"
+
+
+# the parser itself is a dependency of the cached config as well
+def cache_stamp(cfg: dict) -> list:
+    return config_stamp([os.path.realpath(__file__)] + cfg["__config_deps__"])
+
+
+def read_config_cache(module_root: str):
+    cache_file = os.path.join(
+        module_root, build_cache.build_dir_name, config_cache_name
+    )
+    try:
+        with open(cache_file) as f:
+            entry = json.load(f)
+    except (OSError, ValueError):
+        return None
+    cfg = entry.get("cfg", dict())
+    if "__config_deps__" not in cfg or entry.get("stamp") != cache_stamp(cfg):
+        return None
+    return cfg
+
+
+def write_config_cache(module_root: str, cfg: dict) -> None:
+    # configs that do not survive a json round trip are simply not cached
+    try:
+        if json.loads(json.dumps(cfg)) != cfg:
+            return
+    except (TypeError, ValueError):
+        return
+    build_dir = os.path.join(module_root, build_cache.build_dir_name)
+    os.makedirs(build_dir, exist_ok=True)
+    cache_file = os.path.join(build_dir, config_cache_name)
+    tmp_file = "{}.{}.tmp".format(cache_file, os.getpid())
+    with open(tmp_file, "w") as f:
+        json.dump({"stamp": cache_stamp(cfg), "cfg": cfg}, f)
+    os.replace(tmp_file, cache_file)
+
+
+# parsed configs of the module graph, keyed on the module root and invalidated
+# by the stamps of the config dependencies
+module_config_memo = dict()
+
+
+def load_module_config(module_root=None, use_cache=True):
+    if module_root is None:
+        module_root = os.getcwd()
+    module_root = os.path.realpath(module_root)
+    memo = module_config_memo.get(module_root)
+    if memo is not None and memo[0] == config_stamp(memo[1]["__config_deps__"]):
+        return memo[1]
+    cfg = read_config_cache(module_root) if use_cache else None
+    if cfg is None or cfg["__module_root__"] != module_root:
+        cfg = parse_module_config(module_root=module_root)
+        if use_cache:
+            write_config_cache(module_root, cfg)
+    module_config_memo[module_root] = (config_stamp(cfg["__config_deps__"]), cfg)
+    return cfg
+
+
+def create_vivado_dir(
+    cfg, vivado_mode="win_local", gen_work_dir=True, op="sim", keep=None, budget=None
+):
+    # simulator backend, the vivado tools or a stand-in
+    cfg["__backend__"] = sim_backend.get_backend(vivado_mode, cfg.get("sim"))
+    # what is kept of the case results, and the disk budget of the runs
+    cfg["__artifacts__"] = artifacts.load_settings(cfg.get("sim"))
+    # persistent build directory for compiled libraries and snapshots
+    cfg["__build_dir__"] = module_build_dir(cfg)
+    # create working directory, a result directory of this run in the run index
     if gen_work_dir:
-        cfg["__work_dir__"] = os_utils.mkdir_w_datetime(
+        cfg["__work_dir__"] = run_index.new_run_dir(
             cfg["__module_root__"], work_dir_prefix
         )
-    else:
-        cfg["__work_dir__"] = os_utils.get_latest_dir(
-            cfg["__module_root__"], work_dir_prefix
+        run_index.start_run(cfg["__build_dir__"], cfg["__work_dir__"], op)
+        run_index.cleanup(
+            cfg["__build_dir__"],
+            run_index.default_keep if keep is None else keep,
+            cfg["__artifacts__"]["budget"] if budget is None else budget,
         )
+    else:
+        run = run_index.latest_run(cfg["__build_dir__"], op)
+        if run is not None:
+            cfg["__work_dir__"] = run["dir"]
+        else:  # results from before the run index
+            cfg["__work_dir__"] = os_utils.get_latest_dir(
+                cfg["__module_root__"], work_dir_prefix
+            )
+
+
+# a run that exits early is marked as aborted in the run index
+@contextmanager
+def run_guard(cfg):
+    try:
+        yield
+    except BaseException:
+        run_index.abort_run(cfg["__build_dir__"], cfg["__work_dir__"])
+        raise
+
+
+# record the outcome of this run together with the snapshot it used
+def record_run(cfg, status, **fields):
+    if "__lib_dir__" in cfg:
+        cache = build_cache.load_cache(cfg["__lib_dir__"])
+        fields["inputs"] = {
+            "lib_dir": cfg["__lib_dir__"],
+            "compile": build_cache.key_hash(cache.get("compile")),
+            "elaborate": cache.get("elaborate"),
+        }
+    run_index.finish_run(cfg["__build_dir__"], cfg["__work_dir__"], status, **fields)
+
+
+# module roots of the submodule DAG in topological order, dependencies first
+def resolve_module_order(cfg):
+    module_order, resolved, visiting = list(), set(), list()
 
+    def visit(m_cfg):
+        m_root = m_cfg["__module_root__"]
+        if m_root in visiting:
+            cycle = visiting[visiting.index(m_root) :] + [m_root]
+            raise ValueError(
+                "Error: cyclic submodules: "
+                + " -> ".join(os.path.basename(_m) for _m in cycle)
+            )
+        visiting.append(m_root)
+        for m_ in m_cfg["submodules"] or []:
+            m_dir = os.path.realpath(os.path.join(m_root, "..", m_))
+            if m_dir not in resolved:
+                print("--> parsing submodule: {}".format(m_))
+                visit(load_module_config(m_dir))
+        visiting.pop()
+        resolved.add(m_root)
+        module_order.append(m_root)
 
-def parse_rtl_hier(cfg, submodule_list, src_list):
-    cur_module = os_utils.get_cur_dir()
-    if cfg["submodules"] is not None:
-        for m_ in cfg["submodules"]:
-            if m_ in submodule_list:
-                continue  # already parsed
-            # go to that module and parse it
-            print("--> parsing submodule: {}".format(m_))
-            m_dir = os.path.realpath(os.path.join(cfg["__module_root__"], "..", m_))
-            os.chdir(m_dir)
-            m_cfg = parse_module_config()
-            src_list = parse_rtl_hier(m_cfg, submodule_list, src_list)
-            submodule_list.append(m_)
-            os.chdir(cfg["__module_root__"])
-    if cur_module not in submodule_list:
-        src_list += " " + cfg["src_list"]["rtl"]
+    visit(cfg)
+    return module_order
+
+
+# de-duplicated rtl file list of the module and all its submodules
+def resolve_rtl_hier(cfg):
+    src_list, src_set = list(), set()
+    for m_root in resolve_module_order(cfg):
+        m_cfg = cfg if m_root == cfg["__module_root__"] else load_module_config(m_root)
+        for _f in m_cfg["src_list"]["rtl"].split():
+            if _f not in src_set:
+                src_list.append(_f)
+                src_set.add(_f)
     return src_list
 
 
-def module_compile(cfg, w_tb=True):
+def module_compile(cfg, w_tb=True, rebuild=False):
     verif_utils.emph_print("COMPILE")
-    submodule_list = list()
-    src_list = parse_rtl_hier(cfg, submodule_list, "")
-    src_list += " " + cfg["src_list"]["rtl"]
-    comp_opt = vivado_comp_opt
-    if w_tb:
-        src_list += " " + cfg["src_list"]["tb"]
-        comp_opt += " -2008"
-    cmd = vivado_cmd(cfg["__vivado_path__"], vivado_comp, comp_opt)
-    cmd = r"{} {}".format(cmd, src_list)
-    os.chdir(cfg["__work_dir__"])
-    subprocess.call(cmd, shell=True)
-    verif_utils.check_log("xvhdl.log")
+    with perf_utils.stage("compile"):
+        compile_sources(cfg, w_tb, rebuild)
     verif_utils.emph_print(
         "COMPILE: " + verif_utils.pass_string, color="green", bold=True
     )
-    os.chdir(cfg["__module_root__"])
 
 
-def module_elaborate(cfg):
+def compile_sources(cfg, w_tb, rebuild):
+    src_list = resolve_rtl_hier(cfg)
+    comp_opt = cfg["__backend__"].comp_opt
+    if w_tb:
+        src_list += cfg["src_list"]["tb"].split()
+        comp_opt += " -2008"
+    # lint and sim use different options, so keep their libraries apart
+    build_dir = os_utils.mkdir(cfg["__build_dir__"], "sim" if w_tb else "lint")
+    cfg["__lib_dir__"] = build_dir
+    with build_cache.library_lock(build_dir):
+        cache = build_cache.load_cache(build_dir)
+        comp_list, src_state, is_full = build_cache.plan_compile(
+            cache, src_list, comp_opt
+        )
+        if rebuild:
+            comp_list, is_full = src_list, True
+        if is_full:
+            build_cache.clean_library(build_dir)
+        if len(comp_list) == 0:
+            print("All {} sources up to date, skip compiling".format(len(src_state)))
+        else:
+            print("Compiling {} of {} sources".format(len(comp_list), len(src_state)))
+            cfg["__backend__"].compile(build_dir, comp_list, comp_opt)
+            link_build_log(cfg, "xvhdl.log")
+            verif_utils.check_log(os.path.join(cfg["__work_dir__"], "xvhdl.log"))
+            build_cache.update_compile(cache, src_state, comp_opt)
+            build_cache.save_cache(build_dir, cache)
+    # lint refers to the cached library, sim runs to their snapshot once elaborated
+    if not w_tb:
+        link_library(cfg, os.path.join(build_dir, "xsim.dir"))
+
+
+def module_elaborate(cfg, rebuild=False):
     verif_utils.emph_print("ELABORATE")
-    cmd = vivado_cmd(cfg["__vivado_path__"], vivado_elab, vivado_elab_opt)
-    cmd = r"{0} {1} -s {1}_sim".format(cmd, cfg["sim"]["top_name"])
-    os.chdir(cfg["__work_dir__"])
-    subprocess.call(cmd, shell=True)
-    verif_utils.check_log("xelab.log")
+    build_dir = cfg["__lib_dir__"]
+    top_name = cfg["sim"]["top_name"]
+    elab_opt = cfg["__backend__"].elab_opt
+    with build_cache.library_lock(build_dir):
+        cache = build_cache.load_cache(build_dir)
+        if not rebuild and build_cache.is_elab_valid(
+            cache, build_dir, elab_opt, top_name
+        ):
+            print("Snapshot {}_sim up to date, skip elaborating".format(top_name))
+        else:
+            with perf_utils.stage("elaborate"):
+                cfg["__backend__"].elaborate(build_dir, top_name)
+            link_build_log(cfg, "xelab.log")
+            verif_utils.check_log(os.path.join(cfg["__work_dir__"], "xelab.log"))
+            build_cache.update_elab(cache, elab_opt, top_name)
+            build_cache.save_cache(build_dir, cache)
+        # the run keeps its own copy of the snapshot, so a later rebuild changes
+        # neither its results nor the snapshot under concurrent runs
+        link_library(cfg, build_cache.publish_snapshot(cache, build_dir, top_name))
+        build_cache.evict_snapshots(build_dir, snapshots_in_use(cfg))
     verif_utils.emph_print(
         "ELABORATE: " + verif_utils.pass_string, color="green", bold=True
     )
-    os.chdir(cfg["__module_root__"])
 
 
-def module_simulate(cfg):
-    verif_utils.emph_print("SIMULATE")
-    os.chdir(cfg["__work_dir__"])
+def link_library(cfg, lib_dir):
+    lib_link = os.path.join(cfg["__work_dir__"], "xsim.dir")
+    if not os.path.lexists(lib_link):
+        os_utils.symlink(lib_dir, lib_link)
+
+
+# snapshot copies the work directories of the module still link to
+def snapshots_in_use(cfg):
+    root = cfg["__module_root__"]
+    return {
+        os.path.realpath(os.path.join(root, _d, "xsim.dir"))
+        for _d in os.listdir(root)
+        if _d.startswith(work_dir_prefix)
+    }
+
+
+# keep a copy of the tool log in the work directory
+def link_build_log(cfg, log_name):
+    _src = os.path.join(cfg["__lib_dir__"], log_name)
+    if os.path.exists(_src):
+        os_utils.copyfile(_src, os.path.join(cfg["__work_dir__"], log_name))
+
+
+def prepare_fixed_case(cfg, sim_case):
+    case_dir = os_utils.mkdir(cfg["__work_dir__"], sim_case)
+    print("Preparing fixed case [{}] ...".format(sim_case))
+    # link necessay files here
     pat_shared_path = os.path.join(cfg["__module_root__"], "sim")
-    sim_summary = dict()
-    case_dir_list = list()
+    pat_case_path = os.path.join(pat_shared_path, sim_case)
+    sim_tcl = os.path.join(case_dir, module_utils.sim_tcl_name)
+    # 1. sim.tcl: search for case folder first, then use the shared one
+    for _p in [pat_case_path, pat_shared_path]:
+        _src = os.path.join(_p, module_utils.sim_tcl_name)
+        if os.path.exists(_src):
+            os_utils.symlink(_src, sim_tcl)
+            break
+    assert os.path.exists(sim_tcl), "Error: tcl file not found!"
+    # 2. pattern input and output
+    for _f in os.listdir(pat_case_path):
+        if _f.endswith(".txt"):
+            os_utils.symlink(
+                os.path.join(pat_case_path, _f), os.path.join(case_dir, _f)
+            )
+    return case_dir
+
+
+# sources of a generator or comparator class: its module, the frameworks it
+# builds on and the modules listed in its deps
+def script_files(cls):
+    src_files = [
+        sys.modules[c_.__module__].__file__ for c_ in cls.__mro__ if c_ is not object
+    ]
+    return src_files + [m_.__file__ for m_ in getattr(cls, "deps", [])]
+
+
+def prepare_generated_case(cfg, sim_case, pat_cfg, streams=None):
+    assert (
+        cfg["sim"]["pat_gen_script"] is not None
+    ), "Error: pattern generator not defined!"
+    pg_root = importlib.import_module(cfg["sim"]["pat_gen_script"])
+    case_dir = os_utils.mkdir(cfg["__work_dir__"], sim_case)
+    # generated patterns are deterministic, reuse them if config and scripts are unchanged
+    cache_dir = pat_cache_dir(cfg)
+    key = pat_cache.cache_key(pat_cfg, script_files(pg_root.pattern_generator))
+    if pat_cache.fetch(cache_dir, key, case_dir):
+        print("Preparing generated case [{}] ... (cached)".format(sim_case))
+        return case_dir
+    pg = pg_root.pattern_generator(pat_cfg, work_dir=case_dir)
+    try:
+        text = pg.gen_text() if streams is not None else None
+    except NotImplementedError:
+        text = None  # generator without streaming support
+    if text is None:
+        print("Preparing generated case [{}] ...".format(sim_case))
+        pg.run()
+        pat_cache.store(cache_dir, key, case_dir, sim_case)
+    else:
+        # the testbench input goes through a pipe, so there is nothing to cache
+        print("Preparing generated case [{}] ... (streaming)".format(sim_case))
+        for name, chunks in text.items():
+            if name == cfg["sim"]["pat_in"]:
+                streams[name] = chunks
+            else:
+                with open(os.path.join(case_dir, name), "w") as f:
+                    f.writelines(chunks)
+    return case_dir
+
+
+def module_build_dir(cfg):
+    return os.path.join(cfg["__module_root__"], build_cache.build_dir_name)
+
+
+def pat_cache_dir(cfg):
+    return os.path.join(module_build_dir(cfg), pat_cache.cache_dir_name)
+
+
+def link_snapshot(cfg, case_dir):
+    os_utils.symlink(
+        os.path.join(cfg["__work_dir__"], "xsim.dir"),
+        os.path.join(case_dir, "xsim.dir"),
+    )
+
+
+def sim_cmd(cfg):
+    return cfg["__backend__"].sim_cmd(cfg["sim"]["top_name"], module_utils.sim_tcl_name)
+
+
+# own directory of the session of this process, for the files xsim writes at startup
+def session_dir(cfg):
+    s_dir = os_utils.mkdir(cfg["__work_dir__"], "xsim_session_{}".format(os.getpid()))
+    if not os.path.lexists(os.path.join(s_dir, "xsim.dir")):
+        link_snapshot(cfg, s_dir)
+    return s_dir
+
+
+# interactive session on the snapshot, commands come over stdin
+def session_cmd(cfg):
+    return cfg["__backend__"].session_cmd(cfg["sim"]["top_name"])
+
+
+def comparator_class(cfg):
+    pc_root = verif_utils
+    if cfg["sim"]["pat_comp_script"] is not None:
+        pc_root = importlib.import_module(cfg["sim"]["pat_comp_script"])
+    return pc_root.pattern_comparator
+
+
+def case_comparator(cfg, case_dir, max_err=None):
+    return comparator_class(cfg)(
+        os.path.join(case_dir, cfg["sim"]["pat_out"]),
+        os.path.join(case_dir, cfg["sim"]["dut_out"]),
+        max_err=max_err,
+        comp_mode=cfg["sim"].get("pat_comp_mode"),
+        n_jobs=cfg["sim"].get("comp_jobs", 1),
+        with_stats=cfg["sim"].get("comp_stats"),
+    )
+
+
+# inputs the result of a case depends on: the elaborated snapshot, the
+# patterns or their generator, and the comparator
+def case_key(cfg, sim_case, pat_cfg):
+    src_files = script_files(comparator_class(cfg))
+    if pat_cfg is None:
+        pat_shared_path = os.path.join(cfg["__module_root__"], "sim")
+        pat_case_path = os.path.join(pat_shared_path, sim_case)
+        src_files += [
+            os.path.join(pat_case_path, _f) for _f in sorted(os.listdir(pat_case_path))
+        ]
+        shared_tcl = os.path.join(pat_shared_path, module_utils.sim_tcl_name)
+        if os.path.exists(shared_tcl):
+            src_files.append(shared_tcl)
+    else:
+        pg_root = importlib.import_module(cfg["sim"]["pat_gen_script"])
+        src_files += script_files(pg_root.pattern_generator)
+    inputs = {
+        "case": sim_case,
+        "pat_cfg": pat_cfg,
+        "elaborate": build_cache.load_cache(cfg["__lib_dir__"]).get("elaborate"),
+        "comp_mode": cfg["sim"].get("pat_comp_mode"),
+    }
+    return pat_cache.cache_key(inputs, src_files)
+
+
+# run xsim while tailing its log, so that a failing run is killed early
+def watch_sim(cfg, case_dir):
+    log_file = os.path.join(case_dir, "xsim.log")
+    if cfg.get("__sim_worker__"):
+        # one session per snapshot and process, each case is restarted in it
+        scanner = log_scanner.log_scanner(log_file, cfg.get("__kill_errors__"))
+        worker = sim_worker.get_worker(session_cmd(cfg), session_dir(cfg))
+        tcl_file = os.path.join(case_dir, module_utils.sim_tcl_name)
+        worker.run_case(case_dir, tcl_file, log_file, scanner)
+    else:
+        scanner = log_scanner.run_watched(
+            sim_cmd(cfg), case_dir, log_file, cfg.get("__kill_errors__")
+        )
+    return scanner.cnt_err
+
+
+def simulate_case(cfg, sim_case, case_dir, max_err=None):
+    verif_utils.emph_print("SIM CASE: {}".format(sim_case))
+    link_snapshot(cfg, case_dir)
+    with perf_utils.stage("{}/simulate".format(sim_case)):
+        cnt_log = watch_sim(cfg, case_dir)
+    verif_utils.check_log(os.path.join(case_dir, "xsim.log"), cnt_log)
+    pc = case_comparator(cfg, case_dir, max_err)
+    with perf_utils.stage("{}/compare".format(sim_case)):
+        return pc.run()
+
+
+# simulate with the testbench input and the DUT output as named pipes, so that
+# generation, simulation and checking overlap and the case takes no disk for them;
+# the input of a pattern cache hit is the linked cached file, not a pipe
+def stream_case(cfg, sim_case, case_dir, streams, max_err=None):
+    verif_utils.emph_print("SIM CASE: {} (streaming)".format(sim_case))
+    link_snapshot(cfg, case_dir)
+    pat_in = os.path.join(case_dir, cfg["sim"]["pat_in"])
+    dut_out = os.path.join(case_dir, cfg["sim"]["dut_out"])
+    stream_utils.make_fifo(dut_out)
+    pc = case_comparator(cfg, case_dir, max_err)
+    from concurrent.futures import ThreadPoolExecutor
+
+    with perf_utils.stage("{}/stream".format(sim_case)):
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            fut_in = None
+            if cfg["sim"]["pat_in"] in streams:
+                stream_utils.make_fifo(pat_in)
+                fut_in = pool.submit(
+                    stream_utils.write_fifo, pat_in, streams[cfg["sim"]["pat_in"]]
+                )
+            fut_comp = pool.submit(pc.run)
+            cnt_log = watch_sim(cfg, case_dir)
+            # the simulator is gone, release whatever still waits on its pipe ends
+            if fut_in is not None:
+                stream_utils.drain_fifo(pat_in, fut_in)
+            stream_utils.close_fifo(dut_out, fut_comp)
+            cnt_err = fut_comp.result()
+    verif_utils.check_log(os.path.join(case_dir, "xsim.log"), cnt_log)
+    return cnt_err
+
+
+# waveform scope of a case, from the generated case or else the sim config;
+# None keeps the log_wave commands of its tcl file
+def case_wave_scope(cfg, pat_cfg):
+    if pat_cfg is not None and "wave_scope" in pat_cfg:
+        return pat_cfg["wave_scope"]
+    return cfg["sim"].get("wave_scope")
+
+
+# compressed results of a passing case, mismatch windows of a failing one
+def archive_case(cfg, case_dir, cnt_err):
+    artifacts.archive_case(
+        case_dir,
+        os.path.join(case_dir, cfg["sim"]["pat_out"]),
+        os.path.join(case_dir, cfg["sim"]["dut_out"]),
+        cnt_err,
+        case_comparator(cfg, case_dir).diff_line,
+        cfg["__artifacts__"],
+    )
+
+
+# one job of the simulation pool: prepare, simulate and check a single case
+def run_case(cfg, sim_case, pat_cfg=None, max_err=None, stream=False):
+    n_record = len(perf_utils.perf_records)
+    streams = dict() if stream else None
+    with perf_utils.stage("{}/prepare".format(sim_case)):
+        if pat_cfg is None:
+            case_dir = prepare_fixed_case(cfg, sim_case)
+        else:
+            case_dir = prepare_generated_case(cfg, sim_case, pat_cfg, streams)
+        wave_scope = case_wave_scope(cfg, pat_cfg)
+        if wave_scope is not None:
+            module_utils.set_wave_scope(
+                os.path.join(case_dir, module_utils.sim_tcl_name), wave_scope
+            )
+    if stream:
+        cnt_err = stream_case(cfg, sim_case, case_dir, streams, max_err)
+    else:
+        cnt_err = simulate_case(cfg, sim_case, case_dir, max_err)
+    with perf_utils.stage("{}/archive".format(sim_case)):
+        archive_case(cfg, case_dir, cnt_err)
+    # also return the stage records, they stay in the worker process otherwise
+    return cnt_err, perf_utils.perf_records[n_record:]
+
+
+def list_sim_cases(cfg):
+    case_list = list()
     # fixed patterns
     if cfg["sim"]["fixed_cases"] is not None:
         for sim_case in cfg["sim"]["fixed_cases"]:
-            case_dir = os_utils.mkdir(".", sim_case)
-            os.chdir(case_dir)
-            print("Preparing fixed case [{}] ...".format(sim_case))
-            # link necessay files here
-            pat_case_path = os.path.join(pat_shared_path, sim_case)
-            # 1. sim.tcl: search for case folder first, then use the shared one
-            for _p in [pat_case_path, pat_shared_path]:
-                _src = os.path.join(_p, module_utils.sim_tcl_name)
-                if os.path.exists(_src):
-                    os_utils.symlink(_src, module_utils.sim_tcl_name)
-                    break
-            assert os.path.exists(
-                module_utils.sim_tcl_name
-            ), "Error: tcl file not found!"
-            # 2. pattern input and output
-            for _f in os.listdir(pat_case_path):
-                if _f.endswith(".txt"):
-                    os_utils.symlink(os.path.join(pat_case_path, _f), _f)
-            os.chdir(cfg["__work_dir__"])
-            case_dir_list.append(case_dir)
+            case_list.append((sim_case, None))
     # generated patterns
     if cfg["sim"]["generated_cases"] is not None:
-        assert (
-            cfg["sim"]["pat_gen_script"] is not None
-        ), "Error: pattern generator not defined!"
-        pg_root = importlib.import_module(cfg["sim"]["pat_gen_script"])
         for sim_case, pat_cfg in cfg["sim"]["generated_cases"].items():
-            case_dir = os_utils.mkdir(".", sim_case)
-            os.chdir(case_dir)
-            print("Preparing generated case [{}] ...".format(sim_case))
-            pg_root.pattern_generator(pat_cfg).run()
-            os.chdir(cfg["__work_dir__"])
-            case_dir_list.append(case_dir)
-    # simulate
-    for case_dir in case_dir_list:
-        os.chdir(case_dir)
-        sim_case = os_utils.get_cur_dir()
-        verif_utils.emph_print("SIM CASE: {}".format(sim_case))
-        # link the xsim snapshot
-        os_utils.symlink(os.path.join(cfg["__work_dir__"], "xsim.dir"), "xsim.dir")
-        # simulate
-        cmd = vivado_cmd(cfg["__vivado_path__"], vivado_sim, vivado_sim_opt)
-        cmd = r"{0} {1}_sim -t {2}".format(
-            cmd, cfg["sim"]["top_name"], module_utils.sim_tcl_name
+            # binary expected outputs leave no pat_out.txt for text comparators
+            if pat_cfg.get("pat_format", "txt") == "npy":
+                assert comparator_class(cfg).reads_arrays(
+                    cfg["sim"].get("pat_comp_mode")
+                ), "Error: the comparator of case {} cannot read pat_format: npy".format(
+                    sim_case
+                )
+            n_shard = pat_cfg.get("shards", 1)
+            if n_shard <= 1:
+                case_list.append((sim_case, pat_cfg))
+                continue
+            # independent sub-cases, each with a slice of the pattern range
+            for i in range(n_shard):
+                s_cfg = {k: v for k, v in pat_cfg.items() if k != "shards"}
+                s_cfg["shard"] = [i, n_shard]
+                case_list.append(("{}{}{}".format(sim_case, shard_sep, i), s_cfg))
+    return case_list
+
+
+# summary row of a case, shards are merged into their parent case
+def case_group(sim_case, pat_cfg):
+    if pat_cfg is not None and "shard" in pat_cfg:
+        return sim_case.rsplit(shard_sep, 1)[0]
+    return sim_case
+
+
+def module_simulate(
+    cfg,
+    n_jobs=1,
+    max_err=None,
+    cache_size=None,
+    stream=False,
+    kill_errors=None,
+    use_worker=False,
+    changed_only=False,
+):
+    verif_utils.emph_print("SIMULATE")
+    cfg["__kill_errors__"] = kill_errors  # fatal errors kill the simulator anyway
+    cfg["__sim_worker__"] = use_worker
+    if stream and not stream_utils.is_supported:
+        print("Named pipes not supported on this platform, streaming disabled")
+        stream = False
+    case_list = list_sim_cases(cfg)
+    history = case_history.load_history(cfg["__build_dir__"])
+    case_keys = {c_[0]: case_key(cfg, *c_) for c_ in case_list}
+    if changed_only:
+        skipped = [
+            c_[0]
+            for c_ in case_list
+            if case_history.is_unchanged(history, c_[0], case_keys[c_[0]])
+        ]
+        for sim_case in skipped:
+            print(
+                "Case [{}]: unchanged since its pass in {}, skipped".format(
+                    sim_case, history[sim_case]["run"]
+                )
+            )
+        case_list = [c_ for c_ in case_list if c_[0] not in skipped]
+        if len(case_list) == 0:
+            # nothing ran, so neither the run nor the case history has a pass
+            record_run(cfg, "skipped", cases=list(), summary=dict())
+            verif_utils.emph_print("ALL CASES UNCHANGED, NOTHING SIMULATED")
+            return
+    # previously failing cases first, in parallel also the longest ones first
+    run_list = case_history.schedule(case_list, history, by_wall=n_jobs > 1)
+    case_errors, outcomes = dict(), dict()
+
+    def case_done(sim_case, cnt_err, case_records):
+        case_errors[sim_case] = cnt_err
+        outcomes[sim_case] = {
+            "status": "pass" if cnt_err == 0 else "fail",
+            "wall": sum(r_["wall"] for r_ in case_records),
+            "key": case_keys[sim_case],
+        }
+
+    sim_case = None
+    try:
+        with perf_utils.stage("all cases"):
+            if n_jobs > 1:
+                from concurrent.futures import ProcessPoolExecutor, as_completed
+
+                # all cases share the read-only xsim.dir snapshot, so they can run concurrently
+                with ProcessPoolExecutor(max_workers=n_jobs) as pool:
+                    futures = {
+                        pool.submit(run_case, cfg, *c_, max_err, stream): c_[0]
+                        for c_ in run_list
+                    }
+                    for fut in as_completed(futures):
+                        sim_case = futures[fut]
+                        cnt_err, case_records = fut.result()
+                        case_done(sim_case, cnt_err, case_records)
+                        perf_utils.perf_records.extend(case_records)
+            else:
+                for sim_case, pat_cfg in run_list:
+                    case_done(
+                        sim_case, *run_case(cfg, sim_case, pat_cfg, max_err, stream)
+                    )
+    except (Exception, SystemExit):
+        # a case that aborts the simulation is a failing case of this run
+        if sim_case is not None and sim_case not in outcomes:
+            outcomes[sim_case] = {
+                "status": "fail",
+                "wall": None,
+                "key": case_keys[sim_case],
+            }
+        raise
+    finally:
+        case_history.update_history(
+            cfg["__build_dir__"], outcomes, os.path.basename(cfg["__work_dir__"])
         )
-        subprocess.call(cmd, shell=True)
-        verif_utils.check_log("xsim.log")
-        pc_root = verif_utils
-        if cfg["sim"]["pat_comp_script"] is not None:
-            pc_root = importlib.import_module(cfg["sim"]["pat_comp_script"])
-        pc = pc_root.pattern_comparator(cfg["sim"]["pat_out"], cfg["sim"]["dut_out"])
-        sim_summary[sim_case] = pc.run()
-        os.chdir(cfg["__work_dir__"])
-    os.chdir(cfg["__module_root__"])
+    # summary in config order to keep it deterministic
+    sim_summary = dict()
+    for c_ in case_list:
+        group = case_group(*c_)
+        sim_summary[group] = sim_summary.get(group, 0) + case_errors[c_[0]]
+    pat_cache.evict(
+        pat_cache_dir(cfg),
+        pat_cache.default_max_size if cache_size is None else cache_size,
+    )
+    report_perf(cfg)
+    is_pass = all(v == 0 for v in sim_summary.values())
+    record_run(
+        cfg,
+        "pass" if is_pass else "fail",
+        cases=[c_[0] for c_ in case_list],
+        summary=sim_summary,
+    )
     # check simulation summary
     verif_utils.check_sim_summary(sim_summary)
 
 
+def report_perf(cfg):
+    verif_utils.emph_print("PERFORMANCE SUMMARY")
+    perf_utils.print_perf_summary(perf_utils.perf_records)
+    report_file = perf_utils.save_report(
+        cfg["__work_dir__"], perf_utils.perf_records, cfg["__module_root__"]
+    )
+    print("Performance report: {}".format(report_file))
+
+
 def view_latest_result(cfg, sim_dir):
     verif_utils.emph_print("VIEW WAVEFORM: CASE {}".format(sim_dir))
-    sim_path = os.path.join(cfg["__work_dir__"], sim_dir)
-    assert os.path.exists(sim_path)
-    os.chdir(sim_path)
+    # the latest run that simulated this case, not just the latest run
+    run = run_index.latest_run(cfg["__build_dir__"], sim_case=sim_dir)
+    work_dir = cfg["__work_dir__"] if run is None else run["dir"]
+    sim_path = os.path.join(work_dir, sim_dir)
+    assert os.path.exists(sim_path), "Error: no result of case {}".format(sim_dir)
+    if run is not None and "inputs" in run:
+        cache = build_cache.load_cache(run["inputs"]["lib_dir"])
+        if cache.get("elaborate") != run["inputs"]["elaborate"]:
+            print("Note: the snapshot was rebuilt after this run")
     # link waveform config if exists
     pat_shared_path = os.path.join(cfg["__module_root__"], "sim")
-    wcfg_flags = ""
+    wcfg_files = list()
     for _f in os.listdir(pat_shared_path):
         if _f.endswith(".wcfg"):
-            if not os.path.exists(_f):
-                os_utils.symlink(os.path.join(pat_shared_path, _f), _f)
-            wcfg_flags += " -view {}".format(_f)
-    cmd = vivado_cmd(cfg["__vivado_path__"], vivado_sim, vivado_sim_opt)
-    cmd = r"{0} {1}_sim.wdb {2} -gui".format(cmd, cfg["sim"]["top_name"], wcfg_flags)
-    subprocess.call(cmd, shell=True)
-    os.chdir(cfg["__module_root__"])
+            if not os.path.exists(os.path.join(sim_path, _f)):
+                os_utils.symlink(
+                    os.path.join(pat_shared_path, _f), os.path.join(sim_path, _f)
+                )
+            wcfg_files.append(_f)
+    cfg["__backend__"].view(sim_path, cfg["sim"]["top_name"], wcfg_files)
@@ -0,0 +1,59 @@
+import os
+import re
+import sys
+import shutil
+import subprocess
+import pytest
+import yaml
+
+repo_root = os.path.realpath(os.path.join(os.path.dirname(__file__), ".."))
+script_dir = os.path.join(repo_root, "scripts")
+sys.path.insert(0, script_dir)
+
+ansi_code = re.compile(r"\x1b\[[0-9;]*m")
+case_row = re.compile(r"^Case \[(.+)\]: (Pass|Fail) \((\d+) errors\)$", re.M)
+
+
+# copy of a module of the repo without its runs, with sim settings and
+# generated cases overridden, e.g. a smaller n_pat to keep the tests fast
+@pytest.fixture
+def make_module(tmp_path):
+    def make(name, sim=None, cases=None, n_pat=None, copy_name=None):
+        m_dir = str(tmp_path / (copy_name or name) / name)
+        shutil.copytree(
+            os.path.join(repo_root, name),
+            m_dir,
+            ignore=shutil.ignore_patterns("work*", "build"),
+        )
+        cfg_file = os.path.join(m_dir, "config.yml")
+        with open(cfg_file) as f:
+            cfg = yaml.safe_load(f)
+        cfg["sim"].update(sim or dict())
+        for c_, pat_cfg in (cfg["sim"]["generated_cases"] or dict()).items():
+            if n_pat is not None:
+                pat_cfg["n_pat"] = min(pat_cfg["n_pat"], n_pat)
+            pat_cfg.update((cases or dict()).get(c_, dict()))
+        with open(cfg_file, "w") as f:
+            yaml.safe_dump(cfg, f)
+        return m_dir
+
+    return make
+
+
+# main.py of the repo run in a module directory with the fake backend
+def run_main(m_dir, op, *args):
+    proc = subprocess.run(
+        [sys.executable, os.path.join(script_dir, "main.py"), op, "-m", "fake"]
+        + list(args),
+        cwd=m_dir,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        universal_newlines=True,
+    )
+    return proc.returncode, ansi_code.sub("", proc.stdout)
+
+
+# rows of the simulation summary as {case: errors}
+def sim_summary(out):
+    out = out[out.index("SIMULATION SUMMARY") :]
+    return {m_[0]: int(m_[2]) for m_ in case_row.findall(out)}
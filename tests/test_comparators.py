@@ -0,0 +1,105 @@
+import os
+import numpy as np
+import pytest
+import hex_codec
+import verif_utils
+import comp_service
+import pat_comp_cordic
+import pat_gen_cordic
+
+w_data = pat_comp_cordic.w_data
+
+
+# the comparison of the first scripts: all lines in memory, line_comp_cordic of
+# the first CORDIC comparator on each pair, plus the difference of line counts
+def baseline_count(golden, dump):
+    def decode(line):
+        return [hex_codec.hex2int(v, w_data, True) for v in line.split(" ")]
+
+    with open(golden) as f_g, open(dump) as f_d:
+        line_g = [l_.strip().lower() for l_ in f_g]
+        line_d = [l_.strip().lower() for l_ in f_d]
+    cnt_err = 0
+    for lg, ld in zip(line_g, line_d):
+        for g, d in zip(decode(lg), decode(ld)):
+            diff = abs(g - d)
+            is_wrap = abs(diff - (1 << w_data)) < pat_comp_cordic.thr_err
+            if diff > pat_comp_cordic.thr_err and not is_wrap:
+                cnt_err += 1
+                break
+    return cnt_err + abs(len(line_g) - len(line_d))
+
+
+# golden and dump with noise under the threshold, some errors over it, theta
+# wrapping around the signed range, and the upper case and indent of the RTL dump
+def write_pair(tmp_path, n_line, n_err, n_extra=0, seed=0):
+    rng = np.random.RandomState(seed)
+    golden = rng.randint(-(1 << (w_data - 1)), 1 << (w_data - 1), (n_line, 3))
+    dump = golden + rng.randint(-8, 9, golden.shape)
+    dump[: n_line // 10, 2] = golden[: n_line // 10, 2] + (1 << w_data) - 3
+    dump[rng.choice(n_line, n_err, replace=False), rng.randint(0, 3)] += 100
+    if n_extra > 0:
+        dump = np.vstack([dump, dump[:n_extra]])
+    golden_file, dump_file = str(tmp_path / "pat_out.txt"), str(tmp_path / "dut.txt")
+    with open(golden_file, "w") as f:
+        f.write(hex_codec.encode_lines(golden.T, [w_data] * 3).decode())
+    with open(dump_file, "w") as f:
+        text = hex_codec.encode_lines(dump.T, [w_data] * 3).decode().upper()
+        f.write(" " + text.replace("\n", "\n ")[:-1])
+    return golden_file, dump_file
+
+
+def compare(golden, dump, mode, **kwargs):
+    with verif_utils.quiet_output():
+        return pat_comp_cordic.pattern_comparator(
+            golden, dump, comp_mode=mode, **kwargs
+        ).run()
+
+
+@pytest.mark.parametrize("n_extra", [0, 5])
+def test_modes_match_baseline(tmp_path, n_extra):
+    golden, dump = write_pair(tmp_path, 5000, 40, n_extra)
+    expected = baseline_count(golden, dump)
+    assert expected == 40 + n_extra
+    with verif_utils.quiet_output():
+        line_count = verif_utils.check_pat_diff(
+            golden, dump, pat_comp_cordic.line_comp_cordic
+        )
+    assert line_count == expected
+    assert compare(golden, dump, "line") == expected
+    assert compare(golden, dump, "bulk") == expected
+
+
+def test_service_chunks_match_baseline(tmp_path, monkeypatch):
+    golden, dump = write_pair(tmp_path, 20000, 60, 3)
+    monkeypatch.setattr(comp_service, "min_chunk", 1 << 12)
+    with verif_utils.quiet_output():
+        counts = comp_service.check_pairs(
+            [(golden, dump)], f_diff=pat_comp_cordic.line_comp_cordic, n_jobs=2
+        )
+    assert counts == [baseline_count(golden, dump)]
+
+
+def test_max_err_stops_both_modes(tmp_path):
+    golden, dump = write_pair(tmp_path, 5000, 40)
+    assert compare(golden, dump, "line", max_err=7) == 7
+    assert compare(golden, dump, "bulk", max_err=7) == 7
+
+
+# exact mode against the model outputs of the stimulus next to the golden file,
+# where one LSB off is an error that the tolerance modes let through
+def test_exact_mode(tmp_path):
+    pat_cfg = {"n_pat": 2000, "cordic_mode": "vector", "golden": "exact"}
+    pat_cfg["ampl"] = {"mode": "random", "range": [0x1000, 0x3FFF], "seed": 5}
+    pat_gen_cordic.pattern_generator(pat_cfg, work_dir=str(tmp_path)).run()
+    golden = str(tmp_path / "pat_out.txt")
+    val_g = verif_utils.load_pat_array(golden, w_data).copy()
+    val_g[[3, 700, 1999], 0] += 1
+    dump = str(tmp_path / "dut_out.txt")
+    with open(dump, "w") as f:
+        f.write(hex_codec.encode_lines(val_g.T, [w_data] * 3).decode())
+    assert compare(golden, dump, "exact") == 3
+    assert compare(golden, dump, "bulk") == 0
+    os.remove(dump)
+    os.link(golden, dump)
+    assert compare(golden, dump, "exact") == 0
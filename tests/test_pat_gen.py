@@ -0,0 +1,92 @@
+import numpy as np
+import pytest
+import pat_gen_utils
+import pat_gen_cordic
+import vivado_tools as vt
+import regress
+
+vec_case = {
+    "n_pat": 5000,
+    "cordic_mode": "rotate",
+    "ampl": {"mode": "random", "range": [0x1000, 0x3FFF], "seed": 999},
+    "theta_init": {"mode": "random", "range": [0x0000, 0xFFFF], "seed": 888},
+}
+
+
+def gen_text(work_dir, pat_cfg):
+    pat_gen_cordic.pattern_generator(dict(pat_cfg), work_dir=str(work_dir)).run()
+    with open(work_dir / "pat_in.txt") as f_in, open(work_dir / "pat_out.txt") as f_out:
+        return f_in.read(), f_out.read()
+
+
+# the random fields of existing cases are the np.random.seed / randint draws of
+# the first generator, upper bound excluded
+def test_legacy_random_fields():
+    spec = pat_gen_utils.parse_spec("ampl", vec_case["ampl"])
+    np.random.seed(999)
+    expected = np.random.randint(0x1000, 0x3FFF, 5000)
+    v = pat_gen_utils.gen_field(spec, 0, 0, 5000, 0, 5000)
+    assert np.array_equal(v, expected)
+    assert np.array_equal(
+        pat_gen_utils.gen_field(spec, 0, 0, 5000, 1200, 3400), v[1200:3400]
+    )
+    spec = {"mode": "random", "range": [0, 2]}
+    for rng in pat_gen_utils.rng_modes:
+        v = pat_gen_utils.gen_field(spec, 0, 1, 70000, 0, 70000, rng)
+        assert set(np.unique(v)) == {0, 1}
+
+
+def test_shards_split_cases():
+    pat_cfg = dict(vec_case, shards=3)
+    cfg = {
+        "sim": {
+            "fixed_cases": ["basic"],
+            "generated_cases": {"rotate_random": pat_cfg},
+            "pat_comp_script": None,
+        }
+    }
+    case_list = vt.list_sim_cases(cfg)
+    assert [c_[0] for c_ in case_list] == [
+        "basic",
+        "rotate_random.shard0",
+        "rotate_random.shard1",
+        "rotate_random.shard2",
+    ]
+    assert [c_[1]["shard"] for c_ in case_list[1:]] == [[0, 3], [1, 3], [2, 3]]
+    assert {vt.case_group(*c_) for c_ in case_list[1:]} == {"rotate_random"}
+    # regress merges the rows of the shards into one row of the case
+    rows = {
+        "basic": {"status": "pass", "wall": 1.0, "errors": 0},
+        "rotate_random.shard0": {"status": "pass", "wall": 1.0, "errors": 0},
+        "rotate_random.shard1": {"status": "fail", "wall": 2.0, "errors": 4},
+        "rotate_random.shard2": {"status": "fail", "wall": 0.5, "errors": 1},
+    }
+    merged = regress.merge_shards(cfg, rows)
+    assert list(merged) == ["basic", "rotate_random"]
+    assert merged["rotate_random"]["status"] == "fail"
+    assert merged["rotate_random"]["errors"] == 5
+    assert merged["rotate_random"]["wall"] == 3.5
+    assert len(merged["rotate_random"]["shards"]) == 3
+
+
+@pytest.mark.parametrize("rng", ["legacy", "stream"])
+def test_shards_concatenate_to_case(tmp_path, rng):
+    pat_cfg = dict(vec_case, rng=rng)
+    (tmp_path / "full").mkdir()
+    full_in, full_out = gen_text(tmp_path / "full", pat_cfg)
+    shard_in, shard_out = "", ""
+    for i in range(3):
+        (tmp_path / str(i)).mkdir()
+        t_in, t_out = gen_text(tmp_path / str(i), dict(pat_cfg, shard=[i, 3]))
+        shard_in += t_in if i == 0 else t_in.split("\n", 1)[1]  # one header
+        shard_out += t_out
+    assert shard_in == full_in
+    assert shard_out == full_out
+
+
+def test_gen_jobs_match_serial(tmp_path, monkeypatch):
+    monkeypatch.setattr(pat_gen_utils, "n_chunk", 1000)
+    (tmp_path / "serial").mkdir()
+    (tmp_path / "jobs").mkdir()
+    serial = gen_text(tmp_path / "serial", vec_case)
+    assert gen_text(tmp_path / "jobs", dict(vec_case, gen_jobs=3)) == serial
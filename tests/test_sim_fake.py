@@ -0,0 +1,132 @@
+import os
+import glob
+import pytest
+import stream_utils
+from conftest import run_main, sim_summary
+
+n_pat = 3000  # per generated case, enough for a few chunks of the comparators
+faults = {"fake_backend": {"error_rate": 0.003, "seed": 7}}
+
+
+def test_sim_pass(make_module):
+    m_dir = make_module("cordic", n_pat=n_pat)
+    rc, out = run_main(m_dir, "sim")
+    assert rc == 0, out
+    summary = sim_summary(out)
+    assert len(summary) == 7 and set(summary.values()) == {0}
+
+
+# the summary is in config order and the same for any number of jobs
+def test_parallel_summary_is_deterministic(make_module):
+    m_dir = make_module("cordic", sim=faults, n_pat=n_pat)
+    rc_1, out_1 = run_main(m_dir, "sim")
+    rc_n, out_n = run_main(m_dir, "sim", "-j", "3")
+    assert rc_1 != 0 and rc_n != 0
+    summary = sim_summary(out_1)
+    assert sum(summary.values()) > 0
+    assert list(sim_summary(out_n).items()) == list(summary.items())
+
+
+@pytest.mark.parametrize(
+    "flags",
+    [
+        pytest.param(
+            ["--stream"],
+            marks=pytest.mark.skipif(
+                not stream_utils.is_supported, reason="no named pipes"
+            ),
+        ),
+        ["--sim-worker"],
+        ["--sim-worker", "-j", "2"],
+    ],
+)
+def test_round_trips_match_files(make_module, flags):
+    m_dir = make_module("cordic", sim=faults, n_pat=n_pat)
+    _, out = run_main(m_dir, "sim")
+    _, out_rt = run_main(m_dir, "sim", *flags)
+    assert sum(sim_summary(out).values()) > 0
+    assert sim_summary(out_rt) == sim_summary(out)
+
+
+def test_changed_only(make_module):
+    m_dir = make_module("cordic", n_pat=n_pat)
+    rc, _ = run_main(m_dir, "sim")
+    assert rc == 0
+    rc, out = run_main(m_dir, "sim", "--changed-only")
+    assert rc == 0
+    assert out.count("skipped") == 7
+    assert "NOTHING SIMULATED" in out
+    _, runs = run_main(m_dir, "runs")
+    statuses = [l_.split()[-5] for l_ in runs.splitlines() if " sim " in l_]
+    assert statuses == ["pass", "skipped"]
+    # a changed case runs again, the others stay skipped
+    cfg_file = os.path.join(m_dir, "config.yml")
+    with open(cfg_file) as f:
+        text = f.read()
+    with open(cfg_file, "w") as f:
+        f.write(text.replace("seed: 999", "seed: 998"))
+    rc, out = run_main(m_dir, "sim", "--changed-only")
+    assert rc == 0
+    assert list(sim_summary(out)) == ["rotate_random"]
+
+
+def test_shards_merge_in_summary(make_module):
+    m_dir = make_module(
+        "cordic", sim=faults, cases={"rotate_random": {"shards": 3}}, n_pat=n_pat
+    )
+    m_full = make_module("cordic", sim=faults, n_pat=n_pat, copy_name="full")
+    _, out_full = run_main(m_full, "sim")
+    _, out = run_main(m_dir, "sim", "-j", "2")
+    summary = sim_summary(out)
+    assert list(summary) == list(sim_summary(out_full))
+    work_dir = glob.glob(os.path.join(m_dir, "work_*"))[0]
+    shard_dirs = sorted(glob.glob(os.path.join(work_dir, "rotate_random.shard*")))
+    assert [os.path.basename(d_) for d_ in shard_dirs] == [
+        "rotate_random.shard{}".format(i) for i in range(3)
+    ]
+
+
+def test_pattern_cache_hits_and_eviction(make_module):
+    m_dir = make_module("cordic", n_pat=n_pat)
+    _, out = run_main(m_dir, "sim")
+    assert "(cached)" not in out
+    _, out = run_main(m_dir, "sim")
+    assert out.count("(cached)") == 6
+    _, out = run_main(m_dir, "cache")
+    assert "6 entries" in out
+    _, out = run_main(m_dir, "cache", "--prune", "--cache-size", "0")
+    assert "Evicted 6 entries" in out and "0 entries" in out
+    _, out = run_main(m_dir, "sim")
+    assert "(cached)" not in out
+
+
+def test_build_cache_and_snapshots(make_module):
+    m_dir = make_module("cordic", n_pat=n_pat)
+    _, out = run_main(m_dir, "sim")
+    assert "Compiling 5 of 5 sources" in out
+    _, out = run_main(m_dir, "sim")
+    assert "All 5 sources up to date" in out and "up to date, skip elaborating" in out
+    with open(os.path.join(m_dir, "tb", "tb.vhd"), "a") as f:
+        f.write("-- changed\n")
+    _, out = run_main(m_dir, "sim")
+    assert "Compiling 1 of 5 sources" in out
+    # each run keeps the snapshot it was simulated with
+    links = [
+        os.path.realpath(os.path.join(d_, "xsim.dir"))
+        for d_ in sorted(glob.glob(os.path.join(m_dir, "work_*")))
+    ]
+    assert links[0] == links[1] != links[2]
+    assert all(os.path.isdir(l_) for l_ in links)
+
+
+def test_runs_retention(make_module):
+    m_dir = make_module("cordic", n_pat=n_pat)
+    for _ in range(3):
+        assert run_main(m_dir, "sim")[0] == 0
+    _, out = run_main(m_dir, "runs", "--keep", "1")
+    assert "Removed 2 runs" in out and "1 runs" in out
+    assert len(glob.glob(os.path.join(m_dir, "work_*"))) == 1
+    # the snapshot copies of the removed runs go with the next build
+    assert run_main(m_dir, "sim")[0] == 0
+    snapshots = os.path.join(m_dir, "build", "sim", "snapshots")
+    assert len(os.listdir(snapshots)) == 1